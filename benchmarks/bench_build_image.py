@@ -0,0 +1,158 @@
+"""
+BuildImage 基础操作性能测试
+
+使用 Pillow 自带字体，无需下载字体即可离线运行
+
+用法:
+    python benchmarks/bench_build_image.py -o result.json
+    python benchmarks/bench_build_image.py -o new.json --compare old.json
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import PIL
+from PIL import Image, ImageFont
+from PIL.ImageFont import FreeTypeFont
+
+from zhenxun_utils._build_image import BuildImage
+from zhenxun_utils._text_measure import TextMeasure
+
+SIZES = (128, 512, 1024)
+"""画布边长"""
+
+TEXT = "小真寻也很可爱呀 zhenxun 0123456789"
+
+
+def load_font(size: int = 20) -> FreeTypeFont:
+    """加载 Pillow 自带字体"""
+    font = ImageFont.load_default(size)
+    if not isinstance(font, FreeTypeFont):
+        raise TypeError("需要 Pillow>=10.1 且支持 FreeType")
+    return font
+
+
+def sync(method: Callable) -> Callable:
+    """获取绘图操作的同步实现，不计入线程调度耗时"""
+    return getattr(method, "__wrapped__", method)
+
+
+def build_cases(size: int) -> dict[str, Callable[[], object]]:
+    """构造指定尺寸下的测试用例"""
+    font = load_font()
+    canvas = BuildImage(size, size, font=font)
+    opaque = BuildImage(size // 4, size // 4, color=(255, 0, 0), mode="RGB", font=font)
+    alpha = BuildImage(size // 4, size // 4, color=(255, 0, 0, 128), font=font)
+    photo = BuildImage(
+        background=Image.effect_noise((size, size), 64).convert("RGBA"), font=font
+    )
+
+    def fresh() -> BuildImage:
+        return BuildImage(size, size, font=font)
+
+    def measure_cold():
+        TextMeasure.clear()
+        BuildImage.get_text_size(TEXT, font)
+
+    return {
+        "construct": fresh,
+        "text": lambda: sync(BuildImage.text)(canvas, (10, 10), TEXT, font=font),
+        "paste_opaque": lambda: sync(BuildImage.paste)(canvas, opaque, (5, 5)),
+        "paste_alpha": lambda: sync(BuildImage.paste)(canvas, alpha, (5, 5)),
+        "circle": lambda: sync(BuildImage.circle)(fresh()),
+        "circle_corner": lambda: sync(BuildImage.circle_corner)(fresh(), 20),
+        "resize": lambda: sync(BuildImage.resize)(fresh(), 0.5),
+        "transparent": lambda: sync(BuildImage.transparent)(fresh(), 0.5, 2),
+        "filter": lambda: sync(BuildImage.filter)(fresh(), "GaussianBlur", 2),
+        "pic2bytes": photo.pic2bytes,
+        "get_text_size": lambda: BuildImage.get_text_size(TEXT, font),
+        "get_text_size_cold": measure_cold,
+    }
+
+
+def timeit(func: Callable[[], object], repeat: int, min_time: float) -> dict:
+    """多次运行并统计单次耗时(秒)"""
+    func()
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        if (elapsed := time.perf_counter() - start) >= min_time or number >= 1 << 16:
+            break
+        number *= 2
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "number": number,
+        "best": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+    }
+
+
+def run(repeat: int, min_time: float, only: list[str] | None) -> dict:
+    """运行全部测试"""
+    results = []
+    for size in SIZES:
+        for name, func in build_cases(size).items():
+            if only and name not in only:
+                continue
+            result = timeit(func, repeat, min_time)
+            results.append({"name": name, "size": size, **result})
+            print(f"{name:<20}{size:>6}{result['best'] * 1e6:>14.1f} us")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(new: dict, old: dict):
+    """打印与旧结果的对比，比值大于 1 表示变慢"""
+    baseline = {(r["name"], r["size"]): r["best"] for r in old["results"]}
+    print(f"\n{'name':<20}{'size':>6}{'old us':>12}{'new us':>12}{'ratio':>8}")
+    for r in new["results"]:
+        if (key := (r["name"], r["size"])) in baseline:
+            ratio = r["best"] / baseline[key]
+            print(
+                f"{r['name']:<20}{r['size']:>6}{baseline[key] * 1e6:>12.1f}"
+                f"{r['best'] * 1e6:>12.1f}{ratio:>8.2f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="BuildImage 基础操作性能测试")
+    parser.add_argument("-o", "--output", type=Path, help="结果输出 JSON 路径")
+    parser.add_argument("-c", "--compare", type=Path, help="用于对比的旧结果")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="重复次数")
+    parser.add_argument(
+        "--min-time", type=float, default=0.05, help="每轮最少运行时间(秒)"
+    )
+    parser.add_argument("-k", "--only", nargs="*", help="仅运行指定用例")
+    args = parser.parse_args()
+    result = run(args.repeat, args.min_time, args.only)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    if args.compare:
+        compare(result, json.loads(args.compare.read_text(encoding="utf-8")))
+
+
+if __name__ == "__main__":
+    main()
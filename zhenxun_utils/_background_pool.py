@@ -0,0 +1,238 @@
+import math
+import random
+from pathlib import Path
+from typing import Any
+
+from PIL import Image
+from PIL.Image import Image as tImage
+from PIL.ImageFont import FreeTypeFont
+
+from ._build_image import BuildImage, ColorAlias, ResampleType
+from ._image_cache import ImageCache, LRUCache
+from ._render_executor import render_sync
+
+
+class BackgroundPool:
+    """
+    背景图片池
+
+    背景目录只扫描一次，目录修改时间变化时重新扫描，
+    背景图片按目标尺寸向上取整至 bucket_step 的倍数解码缩放后缓存，
+    相近尺寸的画布只需从缓存的变体做一次小比例缩放，
+    缩放结果同样缓存，相同尺寸的画布直接共享像素数据，
+    解码与缩放在 RenderExecutor 中执行
+    """
+
+    bucket_step: int = 256
+    """尺寸分桶步长"""
+    _variants: LRUCache[tuple, tImage] = LRUCache(
+        max_size=0, max_bytes=96 * 1024 * 1024, sizeof=ImageCache.sizeof
+    )
+    _listing: dict[str, tuple[int, tuple[Path, ...]]] = {}  # noqa: RUF012
+    """目录 -> (修改时间, 图片文件)"""
+
+    @classmethod
+    def files(cls, directory: Path) -> tuple[Path, ...]:
+        """获取目录中的图片文件，目录修改时间未变化时使用缓存
+
+        参数:
+            directory: 背景图片目录
+
+        返回:
+            tuple[Path, ...]: 图片文件
+        """
+        key = str(directory)
+        mtime = directory.stat().st_mtime_ns
+        if (listing := cls._listing.get(key)) is None or listing[0] != mtime:
+            extensions = Image.registered_extensions()
+            files = tuple(
+                sorted(
+                    file
+                    for file in directory.iterdir()
+                    if file.suffix.lower() in extensions and file.is_file()
+                )
+            )
+            listing = cls._listing[key] = (mtime, files)
+        return listing[1]
+
+    @classmethod
+    def choice(cls, directory: Path) -> Path | None:
+        """随机选择背景图片
+
+        参数:
+            directory: 背景图片目录
+
+        返回:
+            Path | None: 图片文件，目录为空时为 None
+        """
+        files = cls.files(directory)
+        return random.choice(files) if files else None
+
+    @classmethod
+    def bucket(cls, size: tuple[int, int]) -> tuple[int, int]:
+        """目标尺寸所属的分桶尺寸
+
+        参数:
+            size: 目标尺寸
+
+        返回:
+            tuple[int, int]: 分桶尺寸
+        """
+        step = cls.bucket_step
+        return math.ceil(size[0] / step) * step, math.ceil(size[1] / step) * step
+
+    @classmethod
+    def get(
+        cls,
+        path: Path,
+        size: tuple[int, int],
+        resample: ResampleType | None = None,
+    ) -> tImage:
+        """获取缩放至目标尺寸的背景图片
+
+        参数:
+            path: 图片文件
+            size: 目标尺寸
+            resample: 缩放质量，默认为 BuildImage.background_resample.
+
+        返回:
+            tImage: 缓存中的图片，只读
+        """
+        resample = resample or BuildImage.background_resample
+        stat = path.stat()
+        file_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        key = (*file_key, size, resample)
+        image = cls._variants.get(key)
+        if image is None:
+            variant = cls._variant(path, file_key, cls.bucket(size), resample)
+            image = variant
+            if variant.size != size:
+                image = BuildImage._resize(variant, size, resample)
+                cls._variants.put(key, image)
+        return image
+
+    @classmethod
+    def variant(
+        cls,
+        path: Path,
+        size: tuple[int, int],
+        resample: ResampleType | None = None,
+    ) -> tImage:
+        """获取目标尺寸所属分桶的背景图片，原图小于分桶尺寸的方向不放大，
+        适用于按区域缩放背景的 StripRenderer
+
+        参数:
+            path: 图片文件
+            size: 目标尺寸
+            resample: 缩放质量，默认为 BuildImage.background_resample.
+
+        返回:
+            tImage: 缓存中的图片，只读
+        """
+        stat = path.stat()
+        file_key = (str(path), stat.st_mtime_ns, stat.st_size)
+        return cls._variant(
+            path,
+            file_key,
+            cls.bucket(size),
+            resample or BuildImage.background_resample,
+        )
+
+    @classmethod
+    async def canvas(
+        cls,
+        path: Path,
+        size: tuple[int, int],
+        color: ColorAlias = (255, 255, 255),
+        font: str | Path | FreeTypeFont = "HYWenHei-85W.ttf",
+        font_size: int = 20,
+        copy: bool = False,
+    ) -> BuildImage:
+        """在 RenderExecutor 中构造以背景图片为底的画布
+
+        参数:
+            path: 图片文件
+            size: 画布尺寸
+            color: 画布颜色.
+            font: 字体.
+            font_size: 字体大小.
+            copy: 是否立即复制像素数据，默认在首次写入(包括获取 markImg 与 draw)时复制.
+
+        返回:
+            BuildImage: 画布，与缓存共享像素数据时写入前自动复制
+        """
+        return await render_sync(cls._canvas)(path, size, color, font, font_size, copy)
+
+    @classmethod
+    def _canvas(
+        cls,
+        path: Path,
+        size: tuple[int, int],
+        color: ColorAlias,
+        font: str | Path | FreeTypeFont,
+        font_size: int,
+        copy: bool,
+    ) -> BuildImage:
+        image = cls.get(path, size)
+        if copy:
+            return BuildImage(
+                background=image.copy(), color=color, font=font, font_size=font_size
+            )
+        return BuildImage.from_shared(
+            image, color=color, font=font, font_size=font_size
+        )
+
+    @classmethod
+    def _variant(
+        cls,
+        path: Path,
+        file_key: tuple,
+        bucket: tuple[int, int],
+        resample: ResampleType,
+    ) -> tImage:
+        """获取分桶尺寸的缓存变体，未命中时解码缩放"""
+        key = (*file_key, bucket, resample)
+        variant = cls._variants.get(key)
+        if variant is None:
+            with Image.open(path) as image:
+                # 原图小于分桶尺寸的方向不放大
+                target = (min(bucket[0], image.width), min(bucket[1], image.height))
+                if resample != "lanczos":
+                    image.draft(image.mode, target)
+                variant = BuildImage._load_background(image, target, resample)
+                variant.load()
+            cls._variants.put(key, variant)
+        return variant
+
+    @classmethod
+    def configure(
+        cls,
+        max_bytes: int | None = None,
+        bucket_step: int | None = None,
+    ):
+        """设置缓存上限与分桶步长
+
+        参数:
+            max_bytes: 最大占用字节数.
+            bucket_step: 尺寸分桶步长.
+        """
+        if bucket_step is not None:
+            if bucket_step < 1:
+                raise ValueError("分桶步长必须大于 0...")
+            cls.bucket_step = bucket_step
+        cls._variants.resize(max_bytes=max_bytes)
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._variants.clear()
+        cls._listing.clear()
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 统计数据
+        """
+        return {**cls._variants.stats(), "directories": len(cls._listing)}
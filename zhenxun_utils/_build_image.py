@@ -1,18 +1,25 @@
-import base64
 import contextlib
 import itertools
 import math
+import threading
 import uuid
+from collections.abc import AsyncIterator, Callable, Coroutine
+from functools import wraps
 from io import BytesIO
 from pathlib import Path
-from typing import Literal, TypeAlias, overload
+from typing import Any, Literal, ParamSpec, TypeAlias, TypeVar, overload
 
-from nonebot.utils import run_sync
-from PIL import Image, ImageDraw, ImageFilter, ImageFont
+from PIL import Image, ImageColor, ImageDraw, ImageFilter, ImageFont
 from PIL.Image import Image as tImage
 from PIL.ImageFont import FreeTypeFont
 from typing_extensions import Self
 
+from ._image_cache import FontCache, ImageCache, MaskCache
+from ._image_encoder import EncodeFormat, ImageEncoder
+from ._render_executor import RenderExecutor, render_sync
+from ._render_profile import RenderProfile, profiled
+from ._text_measure import TextMeasure, TextSprite
+
 FONT_PATH = Path(__file__).parent / "font"
 
 ModeType = Literal[
@@ -33,12 +40,231 @@ height: 垂直居中
 width: 水平居中
 """
 
+ResampleType = Literal["fast", "balanced", "lanczos"]
+"""
+缩放质量
+
+fast: 双线性插值，先整数倍缩小
+
+balanced: LANCZOS，先整数倍缩小，与 lanczos 几乎无差别
+
+lanczos: 完整 LANCZOS
+"""
+
+RESAMPLE_CONFIG: dict[ResampleType, tuple[Image.Resampling, float | None]] = {
+    "fast": (Image.Resampling.BILINEAR, 2.0),
+    "balanced": (Image.Resampling.LANCZOS, 3.0),
+    "lanczos": (Image.Resampling.LANCZOS, None),
+}
+"""缩放质量对应的 (重采样滤波器, reducing_gap)"""
+
+_share_lock = threading.Lock()
+
+
+ALPHA_MODES = ("LA", "La", "PA", "RGBA", "RGBa")
+"""带透明度通道的图片类型"""
+
+MASK_MODES = ("1", "L", "LA", "RGBA", "RGBa")
+"""Image.paste 可作为蒙版的图片类型"""
+
+PasteMethod = Literal["blit", "mask", "composite"]
+"""
+贴图方式
+
+blit: 直接复制像素
+
+mask: 以图片自身作为蒙版粘贴
+
+composite: alpha_composite 合成，同时正确合成透明度
+"""
+
+
+def is_opaque_mode(image: tImage) -> bool:
+    """图片类型是否不含透明度
+
+    参数:
+        image: 图片
+
+    返回:
+        bool: 是否不含透明度
+    """
+    return image.mode not in ALPHA_MODES and "transparency" not in image.info
+
+
+def is_opaque_color(color: ColorAlias) -> bool:
+    """颜色是否不透明
+
+    参数:
+        color: 颜色
+
+    返回:
+        bool: 是否不透明
+    """
+    if isinstance(color, str):
+        color = ImageColor.getcolor(color, "RGBA")  # type: ignore
+    return isinstance(color, tuple) and (len(color) < 4 or color[3] == 255)
+
+
+def paste_method(
+    target: tImage, image: tImage, opaque: bool = False, composite: bool = False
+) -> PasteMethod:
+    """根据图片类型选择贴图方式
+
+    参数:
+        target: 目标图片
+        image: 图片
+        opaque: 图片是否已知不含透明像素.
+        composite: 是否使用 alpha_composite 合成透明度.
+
+    返回:
+        PasteMethod: 贴图方式
+    """
+    if composite and not opaque and target.mode == image.mode == "RGBA":
+        return "composite"
+    if image.mode in MASK_MODES and not (opaque and image.mode in ALPHA_MODES):
+        return "mask"
+    return "blit"
+
+
+def paste_image(
+    target: tImage,
+    image: tImage,
+    pos: tuple[int, int],
+    opaque: bool = False,
+    composite: bool = False,
+):
+    """将图片粘贴至目标图片，图片带有透明度时作为蒙版
+
+    参数:
+        target: 目标图片
+        image: 图片
+        pos: 坐标
+        opaque: 图片是否已知不含透明像素，为 True 时直接复制像素.
+        composite: 是否使用 alpha_composite 合成透明度.
+    """
+    method = paste_method(target, image, opaque, composite)
+    if method == "blit":
+        target.paste(image, pos)
+    elif method == "mask":
+        target.paste(image, pos, image)
+    else:
+        x, y = pos
+        if -x < image.width and -y < image.height:
+            target.alpha_composite(
+                image, (max(x, 0), max(y, 0)), (max(-x, 0), max(-y, 0))
+            )
+
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+def _run_op(self: "BuildImage", func: Callable, args: tuple, kwargs: dict) -> Any:
+    """执行绘图操作并更新画布是否不透明，开启 RenderProfile 时记录耗时与像素面积
+
+    像素面积取第一个图片参数(如被粘贴的图片)的面积，没有时取画布面积
+
+    异常:
+        RenderCancelled: 所在的渲染任务已被取消
+    """
+    RenderExecutor.check_cancelled()
+    keep_opaque = self._opaque and _keeps_opaque(func.__name__, args, kwargs)
+    profile = RenderProfile.current()
+    if profile is None:
+        result = func(self, *args, **kwargs)
+    else:
+        image = next(
+            (
+                arg
+                for arg in itertools.chain(args, kwargs.values())
+                if isinstance(arg, BuildImage | tImage)
+            ),
+            self,
+        )
+        with profile.measure(func.__name__, image.width * image.height):
+            result = func(self, *args, **kwargs)
+    self._opaque = keep_opaque or is_opaque_mode(self._markImg)
+    return result
+
+
+def _keeps_opaque(op: str, args: tuple, kwargs: dict) -> bool:
+    """操作是否不会使不透明画布产生透明像素，无法确定时返回 False"""
+    if op in ("resize", "transpose"):
+        return True
+    if op == "paste":
+        if args[3:4] == (True,) or kwargs.get("composite"):
+            # alpha_composite 合成至不透明画布，结果仍不透明
+            return True
+        image = args[0] if args else kwargs.get("image")
+        if isinstance(image, BuildImage):
+            return image._opaque
+        return isinstance(image, tImage) and is_opaque_mode(image)
+    if op == "text":
+        fill = args[2] if len(args) > 2 else kwargs.get("fill", (0, 0, 0))
+        return is_opaque_color(fill)
+    return False
+
+
+def _apply_arg_pending(args: tuple, kwargs: dict[str, Any]):
+    """执行参数中 BuildImage 已记录的绘图操作，被粘贴的图片需为最新像素"""
+    for arg in itertools.chain(args, kwargs.values()):
+        if isinstance(arg, BuildImage) and arg._pending:
+            arg._apply_pending()
+
+
+def _draw_op(func: Callable[P, R]) -> Callable[P, Coroutine[None, None, R]]:
+    """BuildImage 绘图操作装饰器
+
+    正常模式下在 RenderExecutor 中执行操作，录制模式下仅将操作记录至画布，
+    由 flush 统一执行
+    """
+
+    def _call(self: "BuildImage", *args, **kwargs):
+        # 先执行画布与被粘贴图片上仍在记录中的操作
+        self._apply_pending()
+        _apply_arg_pending(args, kwargs)
+        self._unshare()
+        return _run_op(self, func, args, kwargs)
+
+    call = render_sync(_call)
+
+    @wraps(func)
+    async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        self: BuildImage = args[0]  # type: ignore
+        if self._recording:
+            self._pending.append((func, args[1:], kwargs))
+            return self  # type: ignore
+        return await call(*args, **kwargs)
+
+    return wrapper
+
 
 class BuildImage:
     """
     快捷生成图片与操作图片的工具类
     """
 
+    __slots__ = (
+        "__weakref__",
+        "_draw",
+        "_font",
+        "_font_spec",
+        "_markImg",
+        "_opaque",
+        "_pending",
+        "_recording",
+        "_shared",
+        "_uid",
+        "color",
+        "height",
+        "width",
+    )
+
+    resample: ResampleType = "lanczos"
+    """resize 默认缩放质量"""
+    background_resample: ResampleType = "balanced"
+    """构造时缩放背景图片的默认缩放质量，JPEG 等格式会先以接近目标尺寸的比例解码"""
+
     def __init__(
         self,
         width: int = 0,
@@ -47,46 +273,268 @@ class BuildImage:
         mode: ModeType = "RGBA",
         font: str | Path | FreeTypeFont = "HYWenHei-85W.ttf",
         font_size: int = 20,
-        background: str | BytesIO | Path | bytes | None = None,
+        background: str | BytesIO | Path | bytes | tImage | None = None,
+        resample: ResampleType | None = None,
+        cache: bool | None = None,
     ) -> None:
-        self.uid = uuid.uuid1()
+        self._uid: uuid.UUID | None = None
+        self._recording = False
+        self._pending: list[tuple[Callable, tuple, dict[str, Any]]] = []
+        self._shared: list[int] | None = None
+        self._draw: ImageDraw.ImageDraw | None = None
         self.width = width
         self.height = height
         self.color = color
-        self.font = (
-            font if isinstance(font, FreeTypeFont) else self.load_font(font, font_size)
-        )
+        # 字体在首次使用时加载
+        self._font = font if isinstance(font, FreeTypeFont) else None
+        self._font_spec = (font, font_size)
         if background:
-            if isinstance(background, bytes):
-                self.markImg = Image.open(BytesIO(background))
-            else:
-                self.markImg = Image.open(background)
-            if width and height:
-                self.markImg = self.markImg.resize((width, height), Image.LANCZOS)
+            size = (width, height) if width and height else None
+            resample = resample or self.background_resample
+            if isinstance(background, str | Path) and (
+                ImageCache.enable if cache is None else cache
+            ):
+                self.markImg = ImageCache.get(
+                    background,
+                    size,
+                    resample,
+                    lambda path: self._load_background(path, size, resample),
+                )
+                # 缓存中的图片为只读，写入前复制
+                self._shared = [2]
             else:
-                self.width = self.markImg.width
-                self.height = self.markImg.height
+                self.markImg = self._load_background(background, size, resample)
+            self.width, self.height = self.markImg.size
         elif width and height:
             self.markImg = Image.new(mode, (width, height), color)  # type: ignore
+            if mode == "RGBA" and color is not None:
+                self._opaque = is_opaque_color(color)
         else:
             raise ValueError("长度和宽度不能为空...")
-        self.draw = ImageDraw.Draw(self.markImg)
+
+    @property
+    def markImg(self) -> tImage:
+        """图片，获取时执行录制中的操作，与其他画布共享像素数据时先复制一份，
+        获取后可直接修改像素，只读取时使用 view
+        """
+        self._apply_pending()
+        self._unshare()
+        return self._markImg
+
+    @markImg.setter
+    def markImg(self, image: tImage):
+        self._markImg = image
+        self._opaque = is_opaque_mode(image)
+        self._draw = None
+
+    @property
+    def view(self) -> tImage:
+        """只读访问图片，不执行录制中的操作，共享像素数据时也不复制，不能修改"""
+        return self._markImg
+
+    @property
+    def opaque(self) -> bool:
+        """是否已知不含透明像素，为 True 时粘贴至其他画布会直接复制像素
+
+        绘图方法会自动更新该状态，直接修改 markImg 的像素后需重新赋值 markImg
+        """
+        return self._opaque
+
+    @property
+    def draw(self) -> ImageDraw.ImageDraw:
+        """绘图对象，首次使用时创建，获取时与 markImg 相同会执行录制中的操作，
+        并复制与其他画布共享的像素数据
+        """
+        self._apply_pending()
+        self._unshare()
+        if self._draw is None:
+            self._draw = ImageDraw.Draw(self._markImg)
+        return self._draw
+
+    @draw.setter
+    def draw(self, draw: ImageDraw.ImageDraw):
+        self._draw = draw
+
+    @property
+    def font(self) -> FreeTypeFont:
+        """默认字体，首次使用时加载"""
+        if self._font is None:
+            self._font = self.load_font(*self._font_spec)  # type: ignore
+        return self._font
+
+    @font.setter
+    def font(self, font: FreeTypeFont):
+        self._font = font
+
+    @property
+    def uid(self) -> uuid.UUID:
+        """唯一标识，首次使用时生成"""
+        if self._uid is None:
+            self._uid = uuid.uuid1()
+        return self._uid
 
     @property
     def size(self) -> tuple[int, int]:
-        return self.markImg.size
+        return self._markImg.size
+
+    @property
+    def recording(self) -> bool:
+        """是否处于录制模式"""
+        return self._recording
+
+    def start_record(self) -> Self:
+        """开启录制模式，之后的绘图操作仅被记录，直到调用 flush 时统一执行
+
+        返回:
+            BuildImage: Self
+        """
+        self._recording = True
+        return self
+
+    def stop_record(self) -> Self:
+        """关闭录制模式，已记录的操作会在下一次 flush 或绘图操作时执行
+
+        返回:
+            BuildImage: Self
+        """
+        self._recording = False
+        return self
+
+    async def flush(self) -> Self:
+        """在一次 RenderExecutor 调度中执行全部已记录的绘图操作
+
+        等待方被取消时在两次操作之间停止，剩余操作不再执行
+
+        返回:
+            BuildImage: Self
+        """
+        if self._pending:
+            await render_sync(self._apply_pending)()
+        return self
+
+    def flush_sync(self) -> Self:
+        """在当前线程中执行全部已记录的绘图操作，flush 的同步版本
+
+        返回:
+            BuildImage: Self
+        """
+        self._apply_pending()
+        return self
+
+    @contextlib.asynccontextmanager
+    async def record(self) -> AsyncIterator[Self]:
+        """录制上下文，退出时统一执行期间记录的绘图操作
+
+        录制期间 crop/resize 等操作对 width/height 的修改在执行后才生效，
+        参数错误等异常也将在执行时抛出
+
+        用法:
+            async with image.record():
+                await image.text((0, 0), "text")
+                await image.paste(icon, (10, 10))
+        """
+        self.start_record()
+        try:
+            yield self
+        except BaseException:
+            self._pending.clear()
+            raise
+        finally:
+            self.stop_record()
+        await self.flush()
+
+    def _apply_pending(self):
+        """在当前线程中按顺序执行已记录的绘图操作"""
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        self._unshare()
+        for func, args, kwargs in pending:
+            _apply_arg_pending(args, kwargs)
+            _run_op(self, func, args, kwargs)
+
+    def _unshare(self):
+        """写时复制，与其他画布共享像素数据时在写入前复制一份"""
+        if self._shared is None:
+            return
+        with _share_lock:
+            shared, self._shared = self._shared, None
+            if shared[0] <= 1:
+                return
+            shared[0] -= 1
+        opaque = self._opaque
+        self.markImg = self._markImg.copy()
+        self._opaque = opaque
 
     @classmethod
-    def open(cls, path: str | Path | bytes) -> Self:
+    def open(cls, path: str | Path | bytes, cache: bool | None = None) -> Self:
         """打开图片
 
         参数:
             path: 图片路径
+            cache: 是否使用 ImageCache 缓存解码结果，默认为 ImageCache.enable.
 
         返回:
             Self: BuildImage
         """
-        return cls(background=path)
+        return cls(background=path, cache=cache)
+
+    @classmethod
+    def from_shared(
+        cls,
+        image: tImage,
+        color: ColorAlias = (255, 255, 255),
+        font: str | Path | FreeTypeFont = "HYWenHei-85W.ttf",
+        font_size: int = 20,
+    ) -> Self:
+        """以只读图片构造画布，与图片共享像素数据，通过绘图方法或获取 markImg 与 draw
+        写入前自动复制
+
+        参数:
+            image: 图片，如缓存中的图片，调用方不能修改
+            color: 画布颜色.
+            font: 字体.
+            font_size: 字体大小.
+
+        返回:
+            Self: BuildImage
+        """
+        canvas = cls(background=image, color=color, font=font, font_size=font_size)
+        # 原图由调用方持有，计数 2 使首次写入时复制
+        canvas._shared = [2]
+        return canvas
+
+    @classmethod
+    @profiled("decode")
+    def _load_background(
+        cls,
+        background: str | BytesIO | Path | bytes | tImage,
+        size: tuple[int, int] | None,
+        resample: ResampleType,
+    ) -> tImage:
+        """
+        解码背景图片并缩放至目标尺寸
+
+        参数:
+            background: 背景图片
+            size: 目标尺寸
+            resample: 缩放质量
+
+        返回:
+            tImage: 图片
+        """
+        if isinstance(background, tImage):
+            image = background
+        elif isinstance(background, bytes):
+            image = Image.open(BytesIO(background))
+        else:
+            image = Image.open(background)
+        if size:
+            if resample != "lanczos" and not isinstance(background, tImage):
+                # JPEG 等格式直接以接近目标尺寸的比例解码
+                image.draft(image.mode, size)
+            image = cls._resize(image, size, resample)
+        return image
 
     @classmethod
     async def build_text_image(
@@ -154,6 +602,39 @@ class BuildImage:
         返回:
             Self: Self
         """
+        (background_width, background_height), positions = cls.auto_paste_layout(
+            img_list, row, space, padding
+        )
+        background_image = cls(
+            background_width, background_height, color=color, background=background
+        )
+        async with background_image.record():
+            for img, pos in zip(img_list, positions):
+                await background_image.paste(img, pos)
+        return background_image
+
+    @classmethod
+    def auto_paste_layout(
+        cls,
+        img_list: list[Self | tImage],
+        row: int,
+        space: int = 10,
+        padding: int = 50,
+    ) -> tuple[tuple[int, int], list[tuple[int, int]]]:
+        """计算自动贴图布局
+
+        参数:
+            img_list: 图片列表
+            row: 一行图片的数量
+            space: 图片之间的间距.
+            padding: 外边距.
+
+        返回:
+            tuple[tuple[int, int], list[tuple[int, int]]]: 背景尺寸, 每张图片的坐标
+
+        异常:
+            ValueError: 图片列表为空
+        """
         if not img_list:
             raise ValueError("贴图类别为空...")
         width = max(img.size[0] for img in img_list)
@@ -165,43 +646,48 @@ class BuildImage:
                 sum(img.width for img in img_list) + space * (row - 1) + padding * 2
             )
         background_height = height * row_count + space * (row_count - 1) + padding * 2
-        background_image = cls(
-            background_width, background_height, color=color, background=background
-        )
+        positions = []
         _cur_width, _cur_height = padding, padding
         row_num = 0
         for i in range(len(img_list)):
             row_num += 1
             img: Self | tImage = img_list[i]
-            await background_image.paste(img, (_cur_width, _cur_height))
+            positions.append((_cur_width, _cur_height))
             _cur_width += space + img.width
             next_image_width = 0
             if i != len(img_list) - 1:
                 next_image_width = img_list[i + 1].width
             if (
                 row_num == row
-                or _cur_width + padding + next_image_width >= background_image.width + 1
+                or _cur_width + padding + next_image_width >= background_width + 1
             ):
                 _cur_height += space + img.height
                 _cur_width = padding
                 row_num = 0
-        return background_image
+        return (background_width, background_height), positions
 
     @classmethod
+    @profiled("load_font")
     def load_font(
-        cls, font: str | Path = "HYWenHei-85W.ttf", font_size: int = 10
+        cls,
+        font: str | Path = "HYWenHei-85W.ttf",
+        font_size: int = 10,
+        index: int = 0,
+        layout_engine: ImageFont.Layout | None = None,
     ) -> FreeTypeFont:
-        """加载字体
+        """加载字体，相同字体会从 FontCache 中复用
 
         参数:
             font: 字体名称
             font_size: 字体大小
+            index: 字体集合中的字体索引.
+            layout_engine: 排版引擎.
 
         返回:
             FreeTypeFont: 字体
         """
         path = FONT_PATH / font if type(font) is str else font
-        return ImageFont.truetype(str(path), font_size)
+        return FontCache.get(path, font_size, index, layout_engine)
 
     @overload
     @classmethod
@@ -216,6 +702,7 @@ class BuildImage:
     ) -> tuple[int, int]: ...
 
     @classmethod
+    @profiled("measure")
     def get_text_size(
         cls,
         text: str,
@@ -235,14 +722,10 @@ class BuildImage:
         _font = font
         if font and type(font) is str:
             _font = cls.load_font(font, font_size)
-        temp_image = Image.new("RGB", (1, 1), (255, 255, 255))
-        draw = ImageDraw.Draw(temp_image)
-        text_box = draw.textbbox((0, 0), str(text), font=_font)  # type: ignore
-        text_width = text_box[2] - text_box[0]
-        text_height = text_box[3] - text_box[1]
+        text_width, text_height = TextMeasure.size(str(text), _font)  # type: ignore
         return text_width, text_height + 10
-        # return _font.getsize(str(text))  # type: ignore
 
+    @profiled("measure")
     def getsize(self, msg: str) -> tuple[int, int]:
         # sourcery skip: remove-unnecessary-cast
         """
@@ -254,13 +737,8 @@ class BuildImage:
         返回:
             tuple[int, int]: 长宽
         """
-        temp_image = Image.new("RGB", (1, 1), (255, 255, 255))
-        draw = ImageDraw.Draw(temp_image)
-        text_box = draw.textbbox((0, 0), str(msg), font=self.font)
-        text_width = text_box[2] - text_box[0]
-        text_height = text_box[3] - text_box[1]
+        text_width, text_height = TextMeasure.size(str(msg), self.font)
         return text_width, text_height + 10
-        # return self.font.getsize(msg)  # type: ignore
 
     def __center_xy(
         self,
@@ -293,19 +771,22 @@ class BuildImage:
                 height = int((self.height - height) / 2)
         return width, height
 
-    @run_sync
+    @_draw_op
     def paste(
         self,
         image: Self | tImage,
         pos: tuple[int, int] = (0, 0),
         center_type: CenterType | None = None,
+        composite: bool = False,
     ) -> Self:
-        """贴图
+        """贴图，不透明图片直接复制像素，带透明度的图片作为蒙版粘贴
 
         参数:
             image: BuildImage 或 Image
             pos: 定位.
             center_type: 居中.
+            composite: 画布与图片均为 RGBA 时使用 alpha_composite 合成，
+                粘贴至透明画布时透明度更准确.
 
         返回:
             BuildImage: Self
@@ -316,17 +797,16 @@ class BuildImage:
         if center_type and center_type not in ["center", "height", "width"]:
             raise ValueError("center_type must be 'center', 'width' or 'height'")
         _image = image
+        opaque = False
         if isinstance(image, BuildImage):
-            _image = image.markImg
+            _image = image.view
+            opaque = image._opaque
         if _image.width and _image.height and center_type:
             pos = self.__center_xy(pos, _image.width, _image.height, center_type)
-        try:
-            self.markImg.paste(_image, pos, _image)  # type: ignore
-        except ValueError:
-            self.markImg.paste(_image, pos)  # type: ignore
+        paste_image(self.markImg, _image, pos, opaque, composite)  # type: ignore
         return self
 
-    @run_sync
+    @_draw_op
     def point(
         self, pos: tuple[int, int], fill: tuple[int, int, int] | None = None
     ) -> Self:
@@ -343,7 +823,7 @@ class BuildImage:
         self.draw.point(pos, fill=fill)
         return self
 
-    @run_sync
+    @_draw_op
     def ellipse(
         self,
         pos: tuple[int, int, int, int],
@@ -366,7 +846,7 @@ class BuildImage:
         self.draw.ellipse(pos, fill, outline, width)
         return self
 
-    @run_sync
+    @_draw_op
     def text(
         self,
         pos: tuple[int, int],
@@ -408,10 +888,16 @@ class BuildImage:
             ttf_w, ttf_h = self.getsize(max_length_text)  # type: ignore
             # ttf_h = ttf_h * len(sentence)
             pos = self.__center_xy(pos, ttf_w, ttf_h, center_type)
-        self.draw.text(pos, str(text), fill=fill, font=font)
+        draw = self._draw
+        if (
+            draw is not None
+            and (draw.mode != self.markImg.mode or draw.fontmode != "L")
+        ) or not TextSprite.paste(self.markImg, pos, str(text), fill, font):
+            # 自定义了 draw 或 TextSprite 不支持时使用 ImageDraw 绘制
+            self.draw.text(pos, str(text), fill=fill, font=font)
         return self
 
-    @run_sync
+    @render_sync
     def save(self, path: str | Path):
         """
         保存图片
@@ -419,17 +905,25 @@ class BuildImage:
         参数:
             path: 图片路径
         """
-        self.markImg.save(path)  # type: ignore
+        self._apply_pending()
+        self._markImg.save(path)  # type: ignore
 
     def show(self):
         """
         说明:
             显示图片
         """
+        self._apply_pending()
         self.markImg.show()
 
-    @run_sync
-    def resize(self, ratio: float = 0, width: int = 0, height: int = 0) -> Self:
+    @_draw_op
+    def resize(
+        self,
+        ratio: float = 0,
+        width: int = 0,
+        height: int = 0,
+        resample: ResampleType | None = None,
+    ) -> Self:
         """
         压缩图片
 
@@ -437,6 +931,7 @@ class BuildImage:
             ratio: 压缩倍率.
             width: 压缩图片宽度至 width.
             height: 压缩图片高度至 height.
+            resample: 缩放质量，默认为 BuildImage.resample.
 
         返回:
             BuildImage: Self
@@ -450,12 +945,29 @@ class BuildImage:
             if not width and not height:
                 width = int(self.width * ratio)
                 height = int(self.height * ratio)
-            self.markImg = self.markImg.resize((width, height), Image.LANCZOS)  # type: ignore
+            self.markImg = self._resize(
+                self.markImg, (width, height), resample or self.resample
+            )
             self.width, self.height = self.markImg.size
-            self.draw = ImageDraw.Draw(self.markImg)
         return self
 
-    @run_sync
+    @staticmethod
+    def _resize(image: tImage, size: tuple[int, int], resample: ResampleType) -> tImage:
+        """
+        按缩放质量缩放图片
+
+        参数:
+            image: 图片
+            size: 目标尺寸
+            resample: 缩放质量
+
+        返回:
+            tImage: 缩放后的图片
+        """
+        filter_, reducing_gap = RESAMPLE_CONFIG[resample]
+        return image.resize(size, filter_, reducing_gap=reducing_gap)
+
+    @_draw_op
     def crop(self, box: tuple[int, int, int, int]) -> Self:
         """
         裁剪图片
@@ -468,10 +980,9 @@ class BuildImage:
         """
         self.markImg = self.markImg.crop(box)
         self.width, self.height = self.markImg.size
-        self.draw = ImageDraw.Draw(self.markImg)
         return self
 
-    @run_sync
+    @_draw_op
     def transparent(self, alpha_ratio: float = 1, n: int = 0) -> Self:
         """
         图片透明化
@@ -483,35 +994,179 @@ class BuildImage:
         返回:
             BuildImage: Self
         """
-        self.markImg = self.markImg.convert("RGBA")
         x, y = self.markImg.size
-        for i, k in itertools.product(range(n, x - n), range(n, y - n)):
-            color = self.markImg.getpixel((i, k))
-            color = color[:-1] + (int(100 * alpha_ratio),)
-            self.markImg.putpixel((i, k), color)
-        self.draw = ImageDraw.Draw(self.markImg)
+        if x - n > n and y - n > n:
+            alpha = Image.new("L", (x - n * 2, y - n * 2), int(100 * alpha_ratio))
+            self._paste_alpha(alpha, (n, n, x - n, y - n))
+        else:
+            self.markImg = self.markImg.convert("RGBA")
         return self
 
-    def pic2bs4(self) -> str:
+    @_draw_op
+    def set_alpha(
+        self,
+        alpha: int,
+        box: tuple[int, int, int, int] | None = None,
+        mask: Self | tImage | None = None,
+    ) -> Self:
+        """
+        设置区域透明度
+
+        参数:
+            alpha: 透明度 0~255.
+            box: 区域 (left, upper, right, lower)，为空时为整张图片.
+            mask: 蒙版，尺寸需与区域一致，按蒙版灰度混合新旧透明度.
+
+        返回:
+            BuildImage: Self
+        """
+        box = box or (0, 0, *self.markImg.size)
+        alpha_ = Image.new("L", (box[2] - box[0], box[3] - box[1]), alpha)
+        self._paste_alpha(alpha_, box, mask)
+        return self
+
+    @_draw_op
+    def fade(
+        self,
+        ratio: float,
+        box: tuple[int, int, int, int] | None = None,
+        mask: Self | tImage | None = None,
+    ) -> Self:
+        """
+        按比例降低区域透明度
+
+        参数:
+            ratio: 保留原透明度的比例 0~1.
+            box: 区域 (left, upper, right, lower)，为空时为整张图片.
+            mask: 蒙版，尺寸需与区域一致，按蒙版灰度混合新旧透明度.
+
+        返回:
+            BuildImage: Self
+        """
+        box = box or (0, 0, *self.markImg.size)
+        if "A" in self.markImg.getbands():
+            alpha = self.markImg.getchannel("A").crop(box)
+            alpha = alpha.point(lambda v: int(v * ratio))
+        else:
+            alpha = Image.new("L", (box[2] - box[0], box[3] - box[1]), int(255 * ratio))
+        self._paste_alpha(alpha, box, mask)
+        return self
+
+    def _paste_alpha(
+        self,
+        alpha: tImage,
+        box: tuple[int, int, int, int],
+        mask: Self | tImage | None = None,
+    ):
+        """
+        将透明度通道写入图片区域
+
+        参数:
+            alpha: 区域透明度通道
+            box: 区域
+            mask: 蒙版.
+
+        异常:
+            ValueError: 蒙版尺寸与区域不一致
+        """
+        img = self.markImg.convert("RGBA")
+        if mask is not None:
+            _mask = mask.view if isinstance(mask, BuildImage) else mask
+            if _mask.size != alpha.size:
+                raise ValueError("蒙版尺寸必须与区域尺寸一致...")
+            if _mask.mode != "L":
+                _mask = (
+                    _mask.getchannel("A")
+                    if "A" in _mask.getbands()
+                    else _mask.convert("L")
+                )
+            alpha = Image.composite(alpha, img.getchannel("A").crop(box), _mask)
+        band = img.getchannel("A")
+        band.paste(alpha, box[:2])
+        img.putalpha(band)
+        self.markImg = img
+
+    def pic2bs4(
+        self,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> str:
         """BuildImage 转 base64
 
+        参数:
+            format: 输出格式，默认为 ImageEncoder.default_format.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
         返回:
             str: base64
         """
-        buf = BytesIO()
-        self.markImg.save(buf, format="PNG")
-        base64_str = base64.b64encode(buf.getvalue()).decode()
-        return f"base64://{base64_str}"
+        self._apply_pending()
+        return ImageEncoder.encode_base64(
+            self._markImg, format, quality, compress_level
+        )
 
-    def pic2bytes(self) -> bytes:
+    def pic2bytes(
+        self,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> bytes:
         """获取bytes
 
+        参数:
+            format: 输出格式，默认为 ImageEncoder.default_format.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            bytes: bytes
+        """
+        self._apply_pending()
+        return ImageEncoder.encode(self._markImg, format, quality, compress_level)
+
+    async def pic2bs4_async(
+        self,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> str:
+        """在 RenderExecutor 中转换 base64
+
+        参数:
+            format: 输出格式，默认为 ImageEncoder.default_format.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            str: base64
+        """
+        await self.flush()
+        return await ImageEncoder.encode_base64_async(
+            self._markImg, format, quality, compress_level
+        )
+
+    async def pic2bytes_async(
+        self,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> bytes:
+        """在 RenderExecutor 中获取bytes
+
+        参数:
+            format: 输出格式，默认为 ImageEncoder.default_format.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
         返回:
             bytes: bytes
         """
-        buf = BytesIO()
-        self.markImg.save(buf, format="PNG")
-        return buf.getvalue()
+        await self.flush()
+        return await ImageEncoder.encode_async(
+            self._markImg, format, quality, compress_level
+        )
 
     def convert(self, type_: ModeType) -> Self:
         """
@@ -523,10 +1178,11 @@ class BuildImage:
         返回:
             BuildImage: Self
         """
+        self._apply_pending()
         self.markImg = self.markImg.convert(type_)
         return self
 
-    @run_sync
+    @_draw_op
     def rectangle(
         self,
         xy: tuple[int, int, int, int],
@@ -549,7 +1205,7 @@ class BuildImage:
         self.draw.rectangle(xy, fill, outline, width)
         return self
 
-    @run_sync
+    @_draw_op
     def polygon(
         self,
         xy: list[tuple[int, int]],
@@ -570,7 +1226,7 @@ class BuildImage:
         self.draw.polygon(xy, fill, outline)
         return self
 
-    @run_sync
+    @_draw_op
     def line(
         self,
         xy: tuple[int, int, int, int],
@@ -591,7 +1247,7 @@ class BuildImage:
         self.draw.line(xy, fill, width)
         return self
 
-    @run_sync
+    @_draw_op
     def circle(self) -> Self:
         """
         图像变圆
@@ -599,30 +1255,16 @@ class BuildImage:
         返回:
             BuildImage: Self
         """
-        self.markImg.convert("RGBA")
         size = self.markImg.size
         r2 = min(size[0], size[1])
         if size[0] != size[1]:
             self.markImg = self.markImg.resize((r2, r2), Image.LANCZOS)  # type: ignore
-        width = 1
-        antialias = 4
-        ellipse_box = [0, 0, r2 - 2, r2 - 2]
-        mask = Image.new(
-            size=[int(dim * antialias) for dim in self.markImg.size],  # type: ignore
-            mode="L",
-            color="black",
-        )
-        draw = ImageDraw.Draw(mask)
-        for offset, fill in (width / -2.0, "black"), (width / 2.0, "white"):
-            left, top = ((value + offset) * antialias for value in ellipse_box[:2])
-            right, bottom = ((value - offset) * antialias for value in ellipse_box[2:])
-            draw.ellipse([left, top, right, bottom], fill=fill)
-        mask = mask.resize(self.markImg.size, Image.LANCZOS)
+        mask = MaskCache.circle(r2)
         with contextlib.suppress(ValueError):
             self.markImg.putalpha(mask)
         return self
 
-    @run_sync
+    @_draw_op
     def circle_corner(
         self,
         radii: int = 30,
@@ -640,30 +1282,18 @@ class BuildImage:
         """
         if point_list is None:
             point_list = ["lt", "rt", "lb", "rb"]
-        # 画圆（用于分离4个角）
         img = self.markImg.convert("RGBA")
-        alpha = img.split()[-1]
-        circle = Image.new("L", (radii * 2, radii * 2), 0)
-        draw = ImageDraw.Draw(circle)
-        draw.ellipse((0, 0, radii * 2, radii * 2), fill=255)  # 黑色方形内切白色圆形
-        w, h = img.size
-        if "lt" in point_list:
-            alpha.paste(circle.crop((0, 0, radii, radii)), (0, 0))
-        if "rt" in point_list:
-            alpha.paste(circle.crop((radii, 0, radii * 2, radii)), (w - radii, 0))
-        if "lb" in point_list:
-            alpha.paste(circle.crop((0, radii, radii, radii * 2)), (0, h - radii))
-        if "rb" in point_list:
-            alpha.paste(
-                circle.crop((radii, radii, radii * 2, radii * 2)),
-                (w - radii, h - radii),
-            )
-        img.putalpha(alpha)
+        if self._opaque:
+            # 不透明图片直接使用缓存的完整蒙版
+            img.putalpha(MaskCache.rounded(img.size, radii, point_list))
+        else:
+            alpha = img.getchannel("A")
+            MaskCache.paste_corners(alpha, radii, point_list)
+            img.putalpha(alpha)
         self.markImg = img
-        self.draw = ImageDraw.Draw(self.markImg)
         return self
 
-    @run_sync
+    @_draw_op
     def rotate(self, angle: int, expand: bool = False) -> Self:
         """
         旋转图片
@@ -678,7 +1308,7 @@ class BuildImage:
         self.markImg = self.markImg.rotate(angle, expand=expand)
         return self
 
-    @run_sync
+    @_draw_op
     def transpose(self, angle: Literal[0, 1, 2, 3, 4, 5, 6]) -> Self:
         """
         旋转图片(包括边框)
@@ -692,7 +1322,7 @@ class BuildImage:
         self.markImg.transpose(angle)
         return self
 
-    @run_sync
+    @_draw_op
     def filter(self, filter_: str, aud: int | None = None) -> Self:
         """
         图片变化
@@ -720,7 +1350,6 @@ class BuildImage:
                 self.markImg = self.markImg.filter(_type(aud))  # type: ignore
             else:
                 self.markImg = self.markImg.filter(_type)
-        self.draw = ImageDraw.Draw(self.markImg)
         return self
 
     def tobytes(self) -> bytes:
@@ -729,12 +1358,36 @@ class BuildImage:
         返回:
             bytes: bytes
         """
-        return self.markImg.tobytes()
+        self._apply_pending()
+        return self._markImg.tobytes()
 
-    def copy(self) -> "BuildImage":
+    def copy(self, cow: bool = False) -> Self:
         """复制
 
+        参数:
+            cow: 写时复制，共享像素数据直到其中一方通过绘图方法写入.
+
         返回:
             BuildImage: Self
         """
-        return BuildImage.open(self.pic2bytes())
+        self._apply_pending()
+        font, font_size = self._font or self._font_spec[0], self._font_spec[1]
+        if not cow:
+            image = self.__class__(
+                background=self._markImg.copy(),
+                color=self.color,
+                font=font,
+                font_size=font_size,
+            )
+            image._opaque = self._opaque
+            return image
+        with _share_lock:
+            if self._shared is None:
+                self._shared = [1]
+            self._shared[0] += 1
+        image = self.__class__(
+            background=self._markImg, color=self.color, font=font, font_size=font_size
+        )
+        image._shared = self._shared
+        image._opaque = self._opaque
+        return image
@@ -381,89 +381,92 @@ class BuildMat:
             # color=(255, 255, 255),
             color=(255, 255, 255, 0),
         )
-        padding_height += 5
-        """高"""
-        await A.line(
-            (
-                padding_width + 5 + _barh_max_text_width,
-                padding_height,
-                padding_width + 5 + _barh_max_text_width,
-                height - padding_height,
-            ),
-            width=2,
-        )
-        """长"""
-        await A.line(
-            (
-                padding_width + 5 + _barh_max_text_width,
-                height - padding_height,
-                width - padding_width + 5,
-                height - padding_height,
-            ),
-            width=2,
-        )
-        x_cur_width = (
-            padding_width + _barh_max_text_width + self.build_data.space[0] + 5
-        )
-        if self.build_data.mat_type != MatType.BARH:
-            """添加字体宽度"""
-            x_cur_width += x_width_list[0][0]
-        x_cur_height = height - y_height_list[0][1] - 5
-        # await A.point((x_cur_width, x_cur_height), (0, 0, 0))
-        x_point = []
-        for i, _x in enumerate(_x_index):
-            """X轴数值"""
-            grid_height = x_cur_height
-            if self.build_data.is_grid:
-                grid_height = padding_height
+        async with A.record():
+            padding_height += 5
+            """高"""
             await A.line(
                 (
-                    x_cur_width,
-                    x_cur_height - 1,
-                    x_cur_width,
-                    grid_height - 5,
-                )
+                    padding_width + 5 + _barh_max_text_width,
+                    padding_height,
+                    padding_width + 5 + _barh_max_text_width,
+                    height - padding_height,
+                ),
+                width=2,
             )
-            x_point.append(x_cur_width - 1)
-            mid_point = x_cur_width - int(x_width_list[i][0] / 2)
-            await A.text((mid_point, x_cur_height), str(_x), font=font)
-            x_cur_width += self.build_data.space[0]
-            if self.build_data.mat_type != MatType.BARH:
-                """添加字体宽度"""
-                x_cur_width += x_width_list[i][0]
-        y_cur_width = padding_width + _barh_max_text_width
-        y_cur_height = height - self.build_data.padding[1] - 9
-        start_height = y_cur_height
-        # await A.point((y_cur_width, y_cur_height), (0, 0, 0))
-        y_point = []
-        for i, _y in enumerate(_y_index):
-            """Y轴数值"""
-            grid_width = y_cur_width
-            if self.build_data.is_grid:
-                grid_width = width - padding_width + 5
-            y_point.append(y_cur_height)
-            await A.line((y_cur_width + 5, y_cur_height, grid_width + 11, y_cur_height))
-            text_width = BuildImage.get_text_size(str(_y), font)[0]
-            await A.text(
+            """长"""
+            await A.line(
                 (
-                    y_cur_width - text_width,
-                    y_cur_height - int(y_height_list[i][1] / 2) - 3,
+                    padding_width + 5 + _barh_max_text_width,
+                    height - padding_height,
+                    width - padding_width + 5,
+                    height - padding_height,
                 ),
-                str(_y),
-                font=font,
+                width=2,
             )
-            y_cur_height -= y_height_list[i][1] + self.build_data.space[1]
-        graph_height = 0
-        if self.build_data.mat_type == MatType.BARH:
-            graph_height = (
-                x_cur_width
-                - self.build_data.space[0]
-                - _barh_max_text_width
-                - padding_width
-                - 5
+            x_cur_width = (
+                padding_width + _barh_max_text_width + self.build_data.space[0] + 5
             )
-        else:
-            graph_height = start_height - y_cur_height + 7
+            if self.build_data.mat_type != MatType.BARH:
+                """添加字体宽度"""
+                x_cur_width += x_width_list[0][0]
+            x_cur_height = height - y_height_list[0][1] - 5
+            # await A.point((x_cur_width, x_cur_height), (0, 0, 0))
+            x_point = []
+            for i, _x in enumerate(_x_index):
+                """X轴数值"""
+                grid_height = x_cur_height
+                if self.build_data.is_grid:
+                    grid_height = padding_height
+                await A.line(
+                    (
+                        x_cur_width,
+                        x_cur_height - 1,
+                        x_cur_width,
+                        grid_height - 5,
+                    )
+                )
+                x_point.append(x_cur_width - 1)
+                mid_point = x_cur_width - int(x_width_list[i][0] / 2)
+                await A.text((mid_point, x_cur_height), str(_x), font=font)
+                x_cur_width += self.build_data.space[0]
+                if self.build_data.mat_type != MatType.BARH:
+                    """添加字体宽度"""
+                    x_cur_width += x_width_list[i][0]
+            y_cur_width = padding_width + _barh_max_text_width
+            y_cur_height = height - self.build_data.padding[1] - 9
+            start_height = y_cur_height
+            # await A.point((y_cur_width, y_cur_height), (0, 0, 0))
+            y_point = []
+            for i, _y in enumerate(_y_index):
+                """Y轴数值"""
+                grid_width = y_cur_width
+                if self.build_data.is_grid:
+                    grid_width = width - padding_width + 5
+                y_point.append(y_cur_height)
+                await A.line(
+                    (y_cur_width + 5, y_cur_height, grid_width + 11, y_cur_height)
+                )
+                text_width = BuildImage.get_text_size(str(_y), font)[0]
+                await A.text(
+                    (
+                        y_cur_width - text_width,
+                        y_cur_height - int(y_height_list[i][1] / 2) - 3,
+                    ),
+                    str(_y),
+                    font=font,
+                )
+                y_cur_height -= y_height_list[i][1] + self.build_data.space[1]
+            graph_height = 0
+            if self.build_data.mat_type == MatType.BARH:
+                graph_height = (
+                    x_cur_width
+                    - self.build_data.space[0]
+                    - _barh_max_text_width
+                    - padding_width
+                    - 5
+                )
+            else:
+                graph_height = start_height - y_cur_height + 7
         return self.InitGraph(
             mark_image=A,
             x_height=height - y_height_list[0][1] - 5,
@@ -494,36 +497,37 @@ class BuildMat:
         await _black_point.circle()
         max_num = max(self.y_index)
         point_list = []
-        for x_p, y in zip(init_graph.x_point, self.build_data.data):
-            """折线图标点"""
-            y_height = int(y / max_num * graph_height)
-            await mark_image.paste(_black_point, (x_p - 3, x_height - y_height))
-            point_list.append((x_p + 1, x_height - y_height + 1))
-        for i in range(len(point_list) - 1):
-            """画线"""
-            a_x, a_y = point_list[i]
-            b_x, b_y = point_list[i + 1]
-            await mark_image.line((a_x, a_y, b_x, b_y), random_color)
-            if self.build_data.display_num:
-                """显示数值"""
-                value = self.build_data.data[i]
-                text_size = BuildImage.get_text_size(str(value), font)
-                await mark_image.text(
-                    (a_x - int(text_size[0] / 2), a_y - text_size[1] - 5),
-                    str(value),
-                    font=font,
-                )
-        """最后一个数值显示"""
-        value = self.build_data.data[-1]
-        text_size = BuildImage.get_text_size(str(value), font)
-        await mark_image.text(
-            (
-                point_list[-1][0] - int(text_size[0] / 2),
-                point_list[-1][1] - text_size[1] - 5,
-            ),
-            str(value),
-            font=font,
-        )
+        async with mark_image.record():
+            for x_p, y in zip(init_graph.x_point, self.build_data.data):
+                """折线图标点"""
+                y_height = int(y / max_num * graph_height)
+                await mark_image.paste(_black_point, (x_p - 3, x_height - y_height))
+                point_list.append((x_p + 1, x_height - y_height + 1))
+            for i in range(len(point_list) - 1):
+                """画线"""
+                a_x, a_y = point_list[i]
+                b_x, b_y = point_list[i + 1]
+                await mark_image.line((a_x, a_y, b_x, b_y), random_color)
+                if self.build_data.display_num:
+                    """显示数值"""
+                    value = self.build_data.data[i]
+                    text_size = BuildImage.get_text_size(str(value), font)
+                    await mark_image.text(
+                        (a_x - int(text_size[0] / 2), a_y - text_size[1] - 5),
+                        str(value),
+                        font=font,
+                    )
+            """最后一个数值显示"""
+            value = self.build_data.data[-1]
+            text_size = BuildImage.get_text_size(str(value), font)
+            await mark_image.text(
+                (
+                    point_list[-1][0] - int(text_size[0] / 2),
+                    point_list[-1][1] - text_size[1] - 5,
+                ),
+                str(value),
+                font=font,
+            )
         return mark_image
 
     async def _build_bar_graph(self, init_graph: InitGraph, bar_color: list[str]):
@@ -554,13 +558,14 @@ class BuildMat:
         graph_height = init_graph.graph_height
         random_color = random.choice(bar_color)
         max_num = max(self.y_index)
-        for y_p, y in zip(init_graph.y_point, self.build_data.data):
-            bar_width = int(y / max_num * graph_height) or 1
-            bar = BuildImage(bar_width, 18, random_color)
-            await mark_image.paste(bar, (y_width + 1, y_p - 9))
-            if self.build_data.display_num:
-                """显示数值"""
-                await mark_image.text(
-                    (y_width + bar_width + 5, y_p - 12), str(y), font=font
-                )
+        async with mark_image.record():
+            for y_p, y in zip(init_graph.y_point, self.build_data.data):
+                bar_width = int(y / max_num * graph_height) or 1
+                bar = BuildImage(bar_width, 18, random_color)
+                await mark_image.paste(bar, (y_width + 1, y_p - 9))
+                if self.build_data.display_num:
+                    """显示数值"""
+                    await mark_image.text(
+                        (y_width + bar_width + 5, y_p - 12), str(y), font=font
+                    )
         return mark_image
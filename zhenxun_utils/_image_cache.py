@@ -0,0 +1,479 @@
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable
+from pathlib import Path
+from typing import Any, Generic, Literal, TypeVar
+
+from PIL import Image, ImageDraw, ImageFont
+from PIL.Image import Image as tImage
+from PIL.ImageFont import FreeTypeFont
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    线程安全的 LRU 缓存，可同时限制条目数量与占用字节数
+    """
+
+    def __init__(
+        self,
+        max_size: int = 128,
+        max_bytes: int = 0,
+        sizeof: Callable[[V], int] | None = None,
+    ) -> None:
+        """
+        参数:
+            max_size: 最大条目数量，为 0 时不限制.
+            max_bytes: 最大占用字节数，为 0 时不限制.
+            sizeof: 计算条目占用字节数的函数.
+        """
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._data: OrderedDict[K, tuple[V, int]] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._data
+
+    def get(self, key: K) -> V | None:
+        """获取缓存，命中时移动至最近使用
+
+        参数:
+            key: 键
+
+        返回:
+            V | None: 缓存值
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key][0]
+            self.misses += 1
+            return None
+
+    def put(self, key: K, value: V, size: int | None = None):
+        """写入缓存
+
+        参数:
+            key: 键
+            value: 值
+            size: 占用字节数，为空时使用 sizeof 计算.
+        """
+        if size is None:
+            size = self.sizeof(value) if self.sizeof else 0
+        with self._lock:
+            if key in self._data:
+                self.current_bytes -= self._data.pop(key)[1]
+            if self.max_bytes and size > self.max_bytes:
+                # 单个条目超出上限时不缓存
+                return
+            self._data[key] = (value, size)
+            self.current_bytes += size
+            self._shrink()
+
+    def get_or_create(
+        self, key: K, factory: Callable[[], V], size: int | None = None
+    ) -> V:
+        """获取缓存，未命中时调用 factory 生成并写入
+
+        参数:
+            key: 键
+            factory: 生成函数
+            size: 占用字节数.
+
+        返回:
+            V: 缓存值
+        """
+        value = self.get(key)
+        if value is None:
+            value = factory()
+            self.put(key, value, size)
+        return value
+
+    def pop(self, key: K) -> V | None:
+        """移除缓存
+
+        参数:
+            key: 键
+
+        返回:
+            V | None: 被移除的值
+        """
+        with self._lock:
+            if key not in self._data:
+                return None
+            value, size = self._data.pop(key)
+            self.current_bytes -= size
+            return value
+
+    def clear(self):
+        """清空缓存与统计"""
+        with self._lock:
+            self._data.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def resize(self, max_size: int | None = None, max_bytes: int | None = None):
+        """修改缓存上限
+
+        参数:
+            max_size: 最大条目数量.
+            max_bytes: 最大占用字节数.
+        """
+        with self._lock:
+            if max_size is not None:
+                self.max_size = max_size
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            self._shrink()
+
+    def stats(self) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 命中数，未命中数，淘汰数，条目数量与占用字节数
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "bytes": self.current_bytes,
+            "max_size": self.max_size,
+            "max_bytes": self.max_bytes,
+        }
+
+    def _shrink(self):
+        """淘汰最久未使用的条目直至满足上限"""
+        while self._data and (
+            (self.max_size and len(self._data) > self.max_size)
+            or (self.max_bytes and self.current_bytes > self.max_bytes)
+        ):
+            _, (_, size) = self._data.popitem(last=False)
+            self.current_bytes -= size
+            self.evictions += 1
+
+
+class FontCache:
+    """
+    进程内字体缓存，避免重复读取与解析字体文件
+
+    缓存的 FreeTypeFont 会被共享，请勿对其调用 set_variation_* 等修改字体状态的方法
+    """
+
+    _cache: LRUCache[tuple[str, int, int, int | None], FreeTypeFont] = LRUCache(
+        max_size=64, max_bytes=256 * 1024 * 1024
+    )
+    enable: bool = True
+    """是否启用缓存"""
+
+    @classmethod
+    def get(
+        cls,
+        path: str | Path,
+        font_size: int,
+        index: int = 0,
+        layout_engine: ImageFont.Layout | None = None,
+    ) -> FreeTypeFont:
+        """获取字体，未命中时加载
+
+        参数:
+            path: 字体路径
+            font_size: 字体大小
+            index: 字体集合中的字体索引.
+            layout_engine: 排版引擎.
+
+        返回:
+            FreeTypeFont: 字体
+        """
+        if not cls.enable:
+            return ImageFont.truetype(
+                str(path), font_size, index=index, layout_engine=layout_engine
+            )
+        key = (str(path), font_size, index, layout_engine)
+        font = cls._cache.get(key)
+        if font is None:
+            font = ImageFont.truetype(
+                str(path), font_size, index=index, layout_engine=layout_engine
+            )
+            cls._cache.put(key, font, cls.sizeof(font))
+        return font
+
+    @classmethod
+    def sizeof(cls, font: FreeTypeFont) -> int:
+        """估算字体占用字节数
+
+        truetype 未找到路径时会按文件名在系统字体目录中查找，
+        因此使用字体实际加载的文件大小，无法获取时按 1MB 估算
+
+        参数:
+            font: 字体
+
+        返回:
+            int: 字节数
+        """
+        try:
+            return os.path.getsize(font.path)  # type: ignore
+        except (OSError, TypeError):
+            return 1024 * 1024
+
+    @classmethod
+    def configure(cls, max_size: int | None = None, max_bytes: int | None = None):
+        """设置缓存上限
+
+        参数:
+            max_size: 最大字体数量.
+            max_bytes: 最大占用字节数(按字体文件大小估算).
+        """
+        cls._cache.resize(max_size, max_bytes)
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 统计数据
+        """
+        return cls._cache.stats()
+
+
+class ImageCache:
+    """
+    图片文件解码缓存，默认关闭
+
+    以 (路径, 修改时间, 文件大小, 目标尺寸, 缩放质量) 为键缓存解码后的图片，
+    BuildImage 使用写时复制引用缓存中的图片，通过绘图方法、markImg 或 draw 写入前复制
+    """
+
+    _cache: LRUCache[tuple, tImage] = LRUCache(max_size=0, max_bytes=128 * 1024 * 1024)
+    enable: bool = False
+    """是否默认启用缓存"""
+
+    @classmethod
+    def get(
+        cls,
+        path: str | Path,
+        size: tuple[int, int] | None,
+        resample: str,
+        loader: Callable[[Path], tImage],
+    ) -> tImage:
+        """获取图片，未命中时使用 loader 解码
+
+        参数:
+            path: 图片路径
+            size: 目标尺寸
+            resample: 缩放质量
+            loader: 解码函数
+
+        返回:
+            tImage: 图片，只读
+        """
+        resolved = Path(path).resolve()
+        stat = resolved.stat()
+        key = (str(resolved), stat.st_mtime_ns, stat.st_size, size, resample)
+        image = cls._cache.get(key)
+        if image is None:
+            image = loader(resolved)
+            image.load()
+            if not getattr(image, "is_animated", False):
+                cls._cache.put(key, image, cls.sizeof(image))
+        return image
+
+    @classmethod
+    def sizeof(cls, image: tImage) -> int:
+        """估算图片占用字节数
+
+        参数:
+            image: 图片
+
+        返回:
+            int: 字节数
+        """
+        return image.width * image.height * len(image.getbands())
+
+    @classmethod
+    def configure(cls, max_size: int | None = None, max_bytes: int | None = None):
+        """设置缓存上限
+
+        参数:
+            max_size: 最大图片数量，为 0 时不限制.
+            max_bytes: 最大占用字节数.
+        """
+        cls._cache.resize(max_size, max_bytes)
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 统计数据
+        """
+        return cls._cache.stats()
+
+
+CornerType = Literal["lt", "rt", "lb", "rb"]
+"""圆角位置"""
+
+
+class MaskCache:
+    """
+    圆形与圆角蒙版缓存
+
+    以 (类型, 尺寸, 半径, 圆角位置, 抗锯齿倍数) 为键缓存 L 模式蒙版，
+    相同尺寸的头像与卡片只需生成一次蒙版，缓存的蒙版为只读
+    """
+
+    _cache: LRUCache[tuple, tImage] = LRUCache(
+        max_size=256,
+        max_bytes=32 * 1024 * 1024,
+        sizeof=lambda image: image.width * image.height,
+    )
+    enable: bool = True
+    """是否启用缓存"""
+
+    @classmethod
+    def _get(cls, key: tuple, factory: Callable[[], tImage]) -> tImage:
+        """获取蒙版，未启用缓存时直接生成"""
+        if not cls.enable:
+            return factory()
+        return cls._cache.get_or_create(key, factory)
+
+    @classmethod
+    def circle(cls, size: int, antialias: int = 4) -> tImage:
+        """获取圆形蒙版，先以 antialias 倍尺寸绘制再缩小以抗锯齿
+
+        参数:
+            size: 边长
+            antialias: 抗锯齿倍数.
+
+        返回:
+            tImage: 蒙版
+        """
+
+        def factory() -> tImage:
+            width = 1
+            ellipse_box = [0, 0, size - 2, size - 2]
+            mask = Image.new("L", (size * antialias, size * antialias), "black")
+            draw = ImageDraw.Draw(mask)
+            for offset, fill in (width / -2.0, "black"), (width / 2.0, "white"):
+                left, top = ((v + offset) * antialias for v in ellipse_box[:2])
+                right, bottom = ((v - offset) * antialias for v in ellipse_box[2:])
+                draw.ellipse([left, top, right, bottom], fill=fill)
+            return mask.resize((size, size), Image.Resampling.LANCZOS)
+
+        return cls._get(("circle", size, antialias), factory)
+
+    @classmethod
+    def corner(cls, radii: int, corner: CornerType) -> tImage:
+        """获取单个圆角蒙版
+
+        参数:
+            radii: 半径
+            corner: 圆角位置
+
+        返回:
+            tImage: 边长为 radii 的蒙版
+        """
+
+        def factory() -> tImage:
+            circle = cls._get(("ellipse", radii), ellipse)
+            x = radii if corner in ("rt", "rb") else 0
+            y = radii if corner in ("lb", "rb") else 0
+            return circle.crop((x, y, x + radii, y + radii))
+
+        def ellipse() -> tImage:
+            circle = Image.new("L", (radii * 2, radii * 2), 0)
+            ImageDraw.Draw(circle).ellipse((0, 0, radii * 2, radii * 2), fill=255)
+            return circle
+
+        return cls._get(("corner", radii, corner), factory)
+
+    @classmethod
+    def rounded(
+        cls, size: tuple[int, int], radii: int, corners: Iterable[CornerType]
+    ) -> tImage:
+        """获取完整尺寸的圆角矩形蒙版，用于不透明图片
+
+        参数:
+            size: 尺寸
+            radii: 半径
+            corners: 圆角位置
+
+        返回:
+            tImage: 蒙版
+        """
+        selected = set(corners)
+        corners = tuple(c for c in ("lt", "rt", "lb", "rb") if c in selected)
+
+        def factory() -> tImage:
+            mask = Image.new("L", size, 255)
+            cls.paste_corners(mask, radii, corners)
+            return mask
+
+        return cls._get(("rounded", size, radii, corners), factory)
+
+    @classmethod
+    def paste_corners(cls, alpha: tImage, radii: int, corners: Iterable[CornerType]):
+        """将圆角蒙版粘贴至透明度通道
+
+        参数:
+            alpha: 透明度通道
+            radii: 半径
+            corners: 圆角位置
+        """
+        w, h = alpha.size
+        positions = {
+            "lt": (0, 0),
+            "rt": (w - radii, 0),
+            "lb": (0, h - radii),
+            "rb": (w - radii, h - radii),
+        }
+        for corner in ("lt", "rt", "lb", "rb"):
+            if corner in corners:
+                alpha.paste(cls.corner(radii, corner), positions[corner])
+
+    @classmethod
+    def configure(cls, max_size: int | None = None, max_bytes: int | None = None):
+        """设置缓存上限
+
+        参数:
+            max_size: 最大蒙版数量.
+            max_bytes: 最大占用字节数.
+        """
+        cls._cache.resize(max_size, max_bytes)
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 统计数据
+        """
+        return cls._cache.stats()
@@ -0,0 +1,243 @@
+import base64
+from io import BytesIO
+from typing import IO, Literal
+
+from PIL import Image
+from PIL.Image import Image as tImage
+
+from ._render_executor import render_sync
+from ._render_profile import profiled
+
+EncodeFormat = Literal["PNG", "JPEG", "WEBP", "auto"]
+"""
+输出格式
+
+auto: 根据图片内容自动选择
+"""
+
+AutoPolicy = Literal["size", "speed"]
+"""
+auto 格式选择策略
+
+size: 体积优先
+
+speed: 速度优先
+"""
+
+
+class ImageEncoder:
+    """
+    图片编码器
+    """
+
+    default_format: EncodeFormat = "PNG"
+    """默认输出格式"""
+    quality: int = 85
+    """JPEG/WEBP 默认质量"""
+    compress_level: int = 6
+    """PNG 默认压缩等级"""
+    auto_policy: AutoPolicy = "size"
+    """auto 格式选择策略"""
+    max_palette_colors: int = 256
+    """颜色数量不超过该值时视为平面图(文字，表格等)，auto 时使用 PNG"""
+
+    @classmethod
+    def configure(
+        cls,
+        default_format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+        auto_policy: AutoPolicy | None = None,
+    ):
+        """设置默认编码参数
+
+        参数:
+            default_format: 默认输出格式.
+            quality: JPEG/WEBP 默认质量.
+            compress_level: PNG 默认压缩等级.
+            auto_policy: auto 格式选择策略.
+        """
+        if default_format is not None:
+            cls.default_format = default_format
+        if quality is not None:
+            cls.quality = quality
+        if compress_level is not None:
+            cls.compress_level = compress_level
+        if auto_policy is not None:
+            cls.auto_policy = auto_policy
+
+    @classmethod
+    def has_alpha(cls, image: tImage) -> bool:
+        """图片是否包含透明像素
+
+        参数:
+            image: 图片
+
+        返回:
+            bool: 是否包含透明像素
+        """
+        if "A" in image.getbands():
+            return image.getchannel("A").getextrema()[0] < 255  # type: ignore
+        return image.mode == "P" and "transparency" in image.info
+
+    @classmethod
+    def choose(
+        cls, image: tImage, policy: AutoPolicy | None = None
+    ) -> tuple[EncodeFormat, dict]:
+        """根据图片内容选择输出格式
+
+        参数:
+            image: 图片
+            policy: 选择策略.
+
+        返回:
+            tuple[EncodeFormat, dict]: 格式, 编码参数
+        """
+        policy = policy or cls.auto_policy
+        sample = image
+        if image.width * image.height > 256 * 256:
+            sample = image.resize(
+                (min(image.width, 256), min(image.height, 256)),
+                Image.Resampling.NEAREST,
+            )
+        flat = sample.getcolors(cls.max_palette_colors) is not None
+        if flat or cls.has_alpha(image):
+            # 平面图或透明图使用无损格式
+            return "PNG", {"compress_level": 9 if policy == "size" else 1}
+        if policy == "size":
+            return "WEBP", {"quality": cls.quality, "method": 4}
+        return "JPEG", {"quality": cls.quality}
+
+    @classmethod
+    @profiled("encode", lambda cls, image, *_, **__: image.width * image.height)
+    def save(
+        cls,
+        image: tImage,
+        fp: IO[bytes],
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> EncodeFormat:
+        """编码图片并写入文件对象
+
+        参数:
+            image: 图片
+            fp: 文件对象
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            EncodeFormat: 实际使用的格式
+        """
+        format = format or cls.default_format
+        params: dict = {}
+        if format == "auto":
+            format, params = cls.choose(image)
+        if format == "PNG":
+            params["compress_level"] = (
+                compress_level
+                if compress_level is not None
+                else params.get("compress_level", cls.compress_level)
+            )
+        else:
+            params["quality"] = quality or params.get("quality", cls.quality)
+        if format == "JPEG" and image.mode not in ("RGB", "L", "CMYK"):
+            if cls.has_alpha(image):
+                # JPEG 不支持透明，合成至白色背景
+                background = Image.new("RGBA", image.size, (255, 255, 255, 255))
+                image = Image.alpha_composite(background, image.convert("RGBA"))
+            image = image.convert("RGB")
+        image.save(fp, format=format, **params)
+        return format
+
+    @classmethod
+    def encode(
+        cls,
+        image: tImage,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> bytes:
+        """编码图片
+
+        参数:
+            image: 图片
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            bytes: 编码后数据
+        """
+        buf = BytesIO()
+        cls.save(image, buf, format, quality, compress_level)
+        return buf.getvalue()
+
+    @classmethod
+    def encode_base64(
+        cls,
+        image: tImage,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> str:
+        """编码图片为 base64，直接从缓冲区编码，不复制中间数据
+
+        参数:
+            image: 图片
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            str: base64://...
+        """
+        buf = BytesIO()
+        cls.save(image, buf, format, quality, compress_level)
+        with buf.getbuffer() as view:
+            return f"base64://{base64.b64encode(view).decode('ascii')}"
+
+    @classmethod
+    async def encode_async(
+        cls,
+        image: tImage,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> bytes:
+        """在 RenderExecutor 中编码图片
+
+        参数:
+            image: 图片
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            bytes: 编码后数据
+        """
+        return await render_sync(cls.encode)(image, format, quality, compress_level)
+
+    @classmethod
+    async def encode_base64_async(
+        cls,
+        image: tImage,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> str:
+        """在 RenderExecutor 中编码图片为 base64
+
+        参数:
+            image: 图片
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            str: base64://...
+        """
+        return await render_sync(cls.encode_base64)(
+            image, format, quality, compress_level
+        )
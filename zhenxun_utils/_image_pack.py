@@ -0,0 +1,117 @@
+import heapq
+import math
+from collections.abc import Sequence
+from typing import NamedTuple
+
+from ._build_image import BuildImage
+
+
+class PackLayout(NamedTuple):
+    """
+    排列结果，可直接传入 build_sort_image
+    """
+
+    size: tuple[int, int]
+    """画布尺寸"""
+    placements: list[tuple[BuildImage, tuple[int, int]]]
+    """每张图片与坐标"""
+    columns: list[list[BuildImage]]
+    """每列图片，自上而下"""
+
+
+class ImagePacker:
+    """
+    多列瀑布流排列
+
+    图片按高度降序依次放入当前最矮的列(小顶堆)，
+    列数根据目标宽高比估算后向两侧调整，整体复杂度 O(n log n)
+    """
+
+    @classmethod
+    def pack(
+        cls,
+        images: Sequence[BuildImage],
+        aspect_ratio: float = 1.0,
+        gap: int | tuple[int, int] = (30, 10),
+        padding: int | tuple[int, int, int, int] = (180, 50, 20, 50),
+        columns: int | None = None,
+        keep_order: bool = False,
+    ) -> PackLayout:
+        """排列图片
+
+        参数:
+            images: 图片列表
+            aspect_ratio: 目标画布宽高比.
+            gap: 间距，元组类型时为 (列间距, 行间距).
+            padding: 画布内边距，元组类型时为 (上，左，下，右).
+            columns: 列数，设置后不根据宽高比计算.
+            keep_order: 保持图片原有顺序，否则按高度降序放置使各列更平均.
+
+        返回:
+            PackLayout: 排列结果
+        """
+        if not images:
+            raise ValueError("排列图片 images 不能为空...")
+        if aspect_ratio <= 0:
+            raise ValueError("宽高比必须大于 0...")
+        if isinstance(gap, int):
+            gap = (gap, gap)
+        if isinstance(padding, int):
+            padding = (padding,) * 4
+        order = list(range(len(images)))
+        if not keep_order:
+            order.sort(key=lambda i: images[i].height, reverse=True)
+        if columns:
+            return cls._layout(images, order, min(columns, len(images)), gap, padding)
+
+        def score(layout: PackLayout) -> float:
+            return abs(math.log(layout.size[0] / layout.size[1] / aspect_ratio))
+
+        # 按等宽列估算: k * 列宽 / (总高度 / k) = 宽高比
+        column_w = max(image.width for image in images) + gap[0]
+        total_h = sum(image.height + gap[1] for image in images)
+        count = round(math.sqrt(aspect_ratio * total_h / column_w))
+        count = min(max(count, 1), len(images))
+        best = cls._layout(images, order, count, gap, padding)
+        best_score = score(best)
+        for step in (1, -1):
+            k = count + step
+            while 1 <= k <= len(images):
+                layout = cls._layout(images, order, k, gap, padding)
+                if (s := score(layout)) >= best_score:
+                    break
+                best, best_score = layout, s
+                k += step
+        return best
+
+    @classmethod
+    def _layout(
+        cls,
+        images: Sequence[BuildImage],
+        order: list[int],
+        count: int,
+        gap: tuple[int, int],
+        padding: tuple[int, int, int, int],
+    ) -> PackLayout:
+        """将图片放入 count 列"""
+        heap = [(0, i) for i in range(count)]
+        columns: list[list[BuildImage]] = [[] for _ in range(count)]
+        for index in order:
+            image = images[index]
+            height, column = heap[0]
+            columns[column].append(image)
+            heapq.heapreplace(heap, (height + image.height + gap[1], column))
+        columns = [c for c in columns if c]
+        top, left, bottom, right = padding
+        placements = []
+        x = left
+        max_h = 0
+        for column in columns:
+            y = top
+            for image in column:
+                placements.append((image, (x, y)))
+                y += image.height + gap[1]
+            max_h = max(max_h, y - gap[1])
+            x += max(image.width for image in column) + gap[0]
+        size = (x - gap[0] + right, max_h + bottom)
+        return PackLayout(size, placements, columns)
@@ -1,12 +1,22 @@
+import asyncio
+import math
 import random
-from collections.abc import Callable
-from io import BytesIO
+from collections.abc import (
+    AsyncIterable,
+    AsyncIterator,
+    Callable,
+    Iterable,
+    Iterator,
+    Sequence,
+)
 from pathlib import Path
+from typing import Any
 
 from PIL.ImageFont import FreeTypeFont
 from pydantic import BaseModel
 
 from ._build_image import BuildImage
+from ._table_render import TableRenderer
 
 
 class RowStyle(BaseModel):
@@ -52,7 +62,9 @@ class ImageTemplate:
             height += title_height + it_height
         width = max([width + padding * 2 + 100, 300])
         height = max([height + padding * 2 + 150, 100])
-        A = BuildImage(width + padding * 2, height + padding * 2, color="#FAF9FE")
+        A = BuildImage(
+            width + padding * 2, height + padding * 2, color="#FAF9FE", mode="RGB"
+        )
         top_head = BuildImage(width, 100, color="#FFFFFF", font_size=40)
         await top_head.line((0, 1, width, 1), "#C2CEFE", 2)
         await top_head.text((15, 20), head_text, "#9FA3B2", "center")
@@ -107,8 +119,6 @@ class ImageTemplate:
         返回:
             BuildImage: 表格图片
         """
-        font = BuildImage.load_font(font_size=50)
-        min_width, _ = BuildImage.get_text_size(head_text, font)
         table = await cls.table(
             column_name,
             data_list,
@@ -117,13 +127,33 @@ class ImageTemplate:
             padding,
             text_style,
         )
+        return await cls._table_frame(table, head_text, tip_text)
+
+    @classmethod
+    async def _table_frame(
+        cls, table: BuildImage, head_text: str, tip_text: str | None
+    ) -> BuildImage:
+        """为表格添加圆角，底色与标题
+
+        参数:
+            table: 表格图片
+            head_text: 标题文本
+            tip_text: 标题注释
+
+        返回:
+            BuildImage: 表格页图片
+        """
+        font = BuildImage.load_font(font_size=50)
+        min_width, _ = BuildImage.get_text_size(head_text, font)
         await table.circle_corner()
         table_bk = BuildImage(
-            max(table.width, min_width) + 100, table.height + 50, "#EAEDF2"
+            max(table.width, min_width) + 100, table.height + 50, "#EAEDF2", "RGB"
         )
         await table_bk.paste(table, center_type="center")
         height = table_bk.height + 200
-        background = BuildImage(table_bk.width, height, (255, 255, 255), font_size=50)
+        background = BuildImage(
+            table_bk.width, height, (255, 255, 255), "RGB", font_size=50
+        )
         await background.paste(table_bk, (0, 200))
         await background.text((0, 50), head_text, "#334762", center_type="width")
         if tip_text:
@@ -150,79 +180,12 @@ class ImageTemplate:
             column_space: 列间距.
             padding: 文本内间距.
             text_style: 文本样式.
-            min_width: 最低宽度
 
         返回:
             BuildImage: 表格图片
         """
-        font = BuildImage.load_font("HYWenHei-85W.ttf", 20)
-        column_data = []
-        for i in range(len(column_name)):
-            c = []
-            for item in data_list:
-                if len(item) > i:
-                    c.append(
-                        item[i] if isinstance(item[i], tuple | list) else str(item[i])
-                    )
-                else:
-                    c.append("")
-            column_data.append(c)
-        build_data_list = []
-        _, base_h = BuildImage.get_text_size("A", font)
-        for i, column_list in enumerate(column_data):
-            name_width, _ = BuildImage.get_text_size(column_name[i], font)
-            _temp = {"width": name_width, "data": column_list}
-            for s in column_list:
-                if isinstance(s, tuple):
-                    w = s[1]
-                else:
-                    w, _ = BuildImage.get_text_size(str(s), font)
-                if w > _temp["width"]:
-                    _temp["width"] = w
-            build_data_list.append(_temp)
-        column_image_list = []
-        column_name_image_list: list[BuildImage] = []
-        for i, data in enumerate(build_data_list):
-            column_name_image = await BuildImage.build_text_image(
-                column_name[i], font, 12, "#C8CCCF"
-            )
-            column_name_image_list.append(column_name_image)
-        max_h = max(c.height for c in column_name_image_list)
-        for i, data in enumerate(build_data_list):
-            width = data["width"] + padding * 2
-            height = (base_h + row_space) * (len(data["data"]) + 1) + padding * 2
-            background = BuildImage(width, height, (255, 255, 255))
-            column_name_image = column_name_image_list[i]
-            await background.paste(column_name_image, (0, 20), center_type="width")
-            cur_h = max_h + row_space + 20
-            for item in data["data"]:
-                style = RowStyle(font=font)
-                if text_style:
-                    style = text_style(column_name[i], item)
-                if isinstance(item, tuple | list):
-                    """图片"""
-                    data, width, height = item
-                    image_ = None
-                    if isinstance(data, Path):
-                        image_ = BuildImage(width, height, background=data)
-                    elif isinstance(data, bytes):
-                        image_ = BuildImage(width, height, background=BytesIO(data))
-                    elif isinstance(data, BuildImage):
-                        image_ = data
-                    if image_:
-                        await background.paste(image_, (padding, cur_h))
-                else:
-                    await background.text(
-                        (padding, cur_h),
-                        item if item is not None else "",
-                        style.font_color,
-                        font=style.font,
-                        font_size=style.font_size,
-                    )
-                cur_h += base_h + row_space
-            column_image_list.append(background)
-        return await BuildImage.auto_paste(
-            column_image_list, len(column_image_list), column_space
+        return await TableRenderer.render(
+            column_name, data_list, row_space, column_space, padding, text_style
         )
 
     @classmethod
@@ -283,3 +246,161 @@ class ImageTemplate:
             width = max(width, w)
             height += h
         return width, height
+
+
+class TablePages:
+    """
+    分页表格
+
+    数据可为列表，迭代器或异步迭代器，列宽根据前 sample_size 行与 max_widths 计算，
+    所有页使用相同的列宽，超出列宽的内容被裁剪，
+    渲染第 N 页时只读取至第 N 页末尾，之后的数据不会被读取与转换
+
+    用法:
+        pages = TablePages("排行榜", None, ["排名", "昵称", "积分"], query_rows())
+        image = await pages.page(3)
+    """
+
+    def __init__(
+        self,
+        head_text: str,
+        tip_text: str | None,
+        column_name: list[str],
+        rows: Iterable[Sequence[Any]] | AsyncIterable[Sequence[Any]],
+        page_size: int = 50,
+        sample_size: int = 200,
+        max_widths: dict[str, int | str] | None = None,
+        row_space: int = 35,
+        column_space: int = 30,
+        padding: int = 5,
+        text_style: Callable[[str, str], RowStyle] | None = None,
+    ) -> None:
+        """
+        参数:
+            head_text: 标题文本
+            tip_text: 标题注释
+            column_name: 表头列表
+            rows: 数据，每项为一行
+            page_size: 每页行数.
+            sample_size: 用于计算列宽的行数.
+            max_widths: 已知的列最大宽度，值为像素宽度或该列最长的文本.
+            row_space: 行间距.
+            column_space: 列间距.
+            padding: 文本内间距.
+            text_style: 文本样式.
+        """
+        if page_size < 1:
+            raise ValueError("每页行数必须大于 0...")
+        self.head_text = head_text
+        self.tip_text = tip_text
+        self.column_name = column_name
+        self.page_size = page_size
+        self.sample_size = sample_size
+        self.max_widths = max_widths or {}
+        self.row_space = row_space
+        self.column_space = column_space
+        self.padding = padding
+        self.text_style = text_style
+        self._sequence = rows if isinstance(rows, Sequence) else None
+        self._iterator: Iterator | AsyncIterator | None = None
+        if self._sequence is None:
+            self._iterator = (
+                aiter(rows) if isinstance(rows, AsyncIterable) else iter(rows)
+            )
+        # 已读取的行
+        self._rows: list[Sequence[Any]] = []
+        self._widths: list[int] | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def total(self) -> int | None:
+        """总页数，数据未读取完毕时为 None"""
+        if (count := self._count()) is None:
+            return None
+        return max(math.ceil(count / self.page_size), 1)
+
+    async def page(self, index: int) -> BuildImage:
+        """渲染指定页
+
+        参数:
+            index: 页码，从 1 开始
+
+        返回:
+            BuildImage: 表格页图片
+
+        异常:
+            ValueError: 页码超出范围
+        """
+        if index < 1:
+            raise ValueError("页码必须大于 0...")
+        start = (index - 1) * self.page_size
+        async with self._lock:
+            # 多读取一行，最后一页恰好填满时也能得知总页数
+            await self._fill(max(start + self.page_size + 1, self.sample_size))
+            if self._widths is None:
+                self._widths = self._measure()
+            rows = self._slice(start, start + self.page_size)
+        if not rows and index > 1:
+            raise ValueError(f"页码超出范围，共 {self.total} 页...")
+        table = await TableRenderer.render(
+            self.column_name,
+            rows,
+            self.row_space,
+            self.column_space,
+            self.padding,
+            self.text_style,
+            self._widths,
+        )
+        return await ImageTemplate._table_frame(table, self.head_text, self.tip_text)
+
+    async def __aiter__(self) -> AsyncIterator[BuildImage]:
+        """依次渲染每一页"""
+        index = 1
+        while True:
+            yield await self.page(index)
+            if (total := self.total) is not None and index >= total:
+                return
+            index += 1
+
+    def _count(self) -> int | None:
+        """已知的总行数"""
+        if self._sequence is not None:
+            return len(self._sequence)
+        return None if self._iterator is not None else len(self._rows)
+
+    def _slice(self, start: int, end: int) -> Sequence[Sequence[Any]]:
+        if self._sequence is not None:
+            return self._sequence[start:end]
+        return self._rows[start:end]
+
+    async def _fill(self, count: int):
+        """从迭代器读取数据直至共有 count 行或读取完毕"""
+        iterator = self._iterator
+        if iterator is None:
+            return
+        try:
+            while len(self._rows) < count:
+                if isinstance(iterator, AsyncIterator):
+                    self._rows.append(await anext(iterator))
+                else:
+                    self._rows.append(next(iterator))
+        except (StopIteration, StopAsyncIteration):
+            self._iterator = None
+
+    def _measure(self) -> list[int]:
+        """根据样本行与已知最大宽度计算列宽"""
+        font = BuildImage.load_font(TableRenderer.font, TableRenderer.font_size)
+        count = len(self.column_name)
+        sample = [
+            TableRenderer.normalize(row, count)
+            for row in self._slice(0, self.sample_size)
+        ]
+        widths = TableRenderer.column_widths(self.column_name, sample, font)
+        for name, width in self.max_widths.items():
+            if name not in self.column_name:
+                continue
+            if isinstance(width, str):
+                width = BuildImage.get_text_size(width, font)[0]
+            i = self.column_name.index(name)
+            widths[i] = max(widths[i], width)
+        return widths
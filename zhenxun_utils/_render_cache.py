@@ -0,0 +1,507 @@
+import asyncio
+import contextlib
+import enum
+import hashlib
+import inspect
+import os
+import struct
+import threading
+import time
+from collections.abc import Awaitable, Callable, Coroutine
+from functools import wraps
+from importlib.metadata import PackageNotFoundError, version
+from io import BytesIO
+from pathlib import Path
+from typing import Any, ParamSpec
+
+import PIL
+from nonebot import logger
+from nonebot.utils import run_sync
+from PIL.Image import Image as tImage
+from PIL.ImageFont import FreeTypeFont
+from pydantic import BaseModel
+
+from . import _build_image
+from ._build_image import BuildImage
+from ._image_cache import LRUCache
+from ._image_encoder import EncodeFormat, ImageEncoder
+
+P = ParamSpec("P")
+
+CACHE_VERSION = 1
+"""缓存格式版本，渲染结果不兼容的修改需增加该值"""
+
+try:
+    PACKAGE_VERSION = version("zhenxun-utils")
+except PackageNotFoundError:
+    PACKAGE_VERSION = "dev"
+
+_HEADER = struct.Struct("!d")
+"""磁盘缓存文件头: 过期时间戳，为 0 时不过期"""
+
+
+class Uncacheable(TypeError):
+    """
+    参数无法计算稳定的哈希值，如 lambda 与局部函数
+    """
+
+
+def _feed(h: "hashlib._Hash", obj: Any):
+    """将参数按类型写入哈希
+
+    异常:
+        Uncacheable: 不支持的参数类型
+    """
+    if obj is None or isinstance(obj, bool | int | float | str | enum.Enum):
+        h.update(f"{type(obj).__name__}:{obj!r};".encode())
+    elif isinstance(obj, bytes | bytearray | memoryview):
+        h.update(b"bytes:%d;" % len(obj))
+        h.update(obj)
+    elif isinstance(obj, BytesIO):
+        _feed(h, obj.getvalue())
+    elif isinstance(obj, Path):
+        # 文件按修改时间与大小区分，不读取内容
+        try:
+            stat = obj.stat()
+            h.update(f"path:{obj}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+        except OSError:
+            h.update(f"path:{obj}:missing;".encode())
+    elif isinstance(obj, list | tuple):
+        h.update(f"{type(obj).__name__}:{len(obj)}[".encode())
+        for item in obj:
+            _feed(h, item)
+        h.update(b"]")
+    elif isinstance(obj, dict):
+        h.update(f"dict:{len(obj)}{{".encode())
+        for key in sorted(obj, key=repr):
+            _feed(h, key)
+            _feed(h, obj[key])
+        h.update(b"}")
+    elif isinstance(obj, set | frozenset):
+        _feed(h, sorted(_digest(item) for item in obj))
+    elif isinstance(obj, BaseModel):
+        h.update(f"model:{type(obj).__qualname__};".encode())
+        # 兼容 pydantic v1
+        dump = getattr(obj, "model_dump", None) or obj.dict
+        _feed(h, dump())
+    elif isinstance(obj, BuildImage):
+        obj._apply_pending()
+        _feed(h, obj.view)
+    elif isinstance(obj, tImage):
+        h.update(f"image:{obj.mode}:{obj.size};".encode())
+        h.update(hashlib.blake2b(obj.tobytes(), digest_size=16).digest())
+    elif isinstance(obj, FreeTypeFont):
+        _feed(h, ("font", str(obj.path), obj.size, obj.index))
+    elif inspect.ismethod(obj):
+        _feed(h, (obj.__self__, obj.__func__))
+    elif inspect.isfunction(obj) or inspect.isclass(obj) or inspect.isbuiltin(obj):
+        qualname = getattr(obj, "__qualname__", "")
+        if "<" in qualname:
+            raise Uncacheable(f"无法缓存局部函数参数 {qualname}")
+        h.update(f"callable:{obj.__module__}:{qualname};".encode())
+    else:
+        raise Uncacheable(f"无法缓存参数类型 {type(obj).__qualname__}")
+
+
+def _digest(obj: Any) -> str:
+    h = hashlib.sha256()
+    _feed(h, obj)
+    return h.hexdigest()
+
+
+_fingerprints: dict[str, tuple[int, tuple]] = {}
+"""字体目录 -> (修改时间, 指纹)"""
+
+
+def font_fingerprint(path: Path | None = None) -> tuple:
+    """字体目录指纹，替换或新增字体文件后缓存失效
+
+    目录修改时间未变化时使用上次的结果，原地覆盖字体文件不会改变目录修改时间，
+    此时需调用 RenderCache.clear
+
+    参数:
+        path: 字体目录，默认为 BuildImage 字体目录.
+
+    返回:
+        tuple: (文件名, 大小, 修改时间) 列表
+    """
+    path = path or _build_image.FONT_PATH
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return ()
+    key = str(path)
+    if (cached := _fingerprints.get(key)) is not None and cached[0] == mtime:
+        return cached[1]
+    fingerprint = ()
+    with contextlib.suppress(OSError), os.scandir(path) as it:
+        fingerprint = tuple(
+            sorted(
+                (e.name, stat.st_size, stat.st_mtime_ns)
+                for e in it
+                if e.is_file() and (stat := e.stat())
+            )
+        )
+    _fingerprints[key] = (mtime, fingerprint)
+    return fingerprint
+
+
+class RenderCache:
+    """
+    渲染结果缓存
+
+    根据模板，参数，编码参数，字体文件与库版本计算键，
+    缓存编码后的数据，命中时跳过渲染与编码，
+    内存缓存默认开启，磁盘缓存需通过 configure 设置目录
+
+    用法:
+        help_image = RenderCache.cached(ttl=3600)(ImageTemplate.hl_page)
+        data = await help_image("帮助", items)
+    """
+
+    enable: bool = True
+    """是否启用"""
+    default_ttl: float = 3600
+    """默认有效期(秒)，为 0 时不过期"""
+    disk_path: Path | None = None
+    """磁盘缓存目录，为 None 时不使用磁盘缓存"""
+    disk_max_bytes: int = 256 * 1024 * 1024
+    """磁盘缓存最大占用字节数"""
+    _memory: LRUCache[str, tuple[float, bytes]] = LRUCache(
+        max_size=256, max_bytes=64 * 1024 * 1024, sizeof=lambda v: len(v[1])
+    )
+    _disk_index: dict[str, tuple[int, float]] | None = None
+    """磁盘缓存索引 key -> (大小, 最近使用时间)，首次使用时扫描目录"""
+    _disk_lock = threading.Lock()
+    _inflight: dict[str, asyncio.Future[bytes]] = {}  # noqa: RUF012
+    """渲染中的键，相同请求等待同一次渲染"""
+    _metrics: dict[str, int] = {  # noqa: RUF012
+        "memory_hits": 0,
+        "disk_hits": 0,
+        "shared": 0,
+        "misses": 0,
+        "bypass": 0,
+    }
+
+    @classmethod
+    def configure(
+        cls,
+        enable: bool | None = None,
+        default_ttl: float | None = None,
+        max_size: int | None = None,
+        max_bytes: int | None = None,
+        disk_path: Path | str | None = None,
+        disk_max_bytes: int | None = None,
+    ):
+        """设置缓存参数
+
+        参数:
+            enable: 是否启用.
+            default_ttl: 默认有效期(秒)，为 0 时不过期.
+            max_size: 内存缓存最大条目数量.
+            max_bytes: 内存缓存最大占用字节数.
+            disk_path: 磁盘缓存目录.
+            disk_max_bytes: 磁盘缓存最大占用字节数.
+        """
+        if enable is not None:
+            cls.enable = enable
+        if default_ttl is not None:
+            if default_ttl < 0:
+                raise ValueError("缓存有效期不能小于 0...")
+            cls.default_ttl = default_ttl
+        cls._memory.resize(max_size, max_bytes)
+        if disk_path is not None:
+            cls.disk_path = Path(disk_path)
+            cls.disk_path.mkdir(parents=True, exist_ok=True)
+            cls._disk_index = None
+        if disk_max_bytes is not None:
+            cls.disk_max_bytes = disk_max_bytes
+
+    @classmethod
+    def key(cls, *parts: Any) -> str:
+        """计算缓存键，包含字体目录指纹与库版本
+
+        参数:
+            parts: 参与计算的内容
+
+        返回:
+            str: 缓存键
+
+        异常:
+            Uncacheable: 参数无法计算稳定的哈希值
+        """
+        return _digest(
+            (
+                CACHE_VERSION,
+                PACKAGE_VERSION,
+                PIL.__version__,
+                font_fingerprint(),
+                parts,
+            )
+        )
+
+    @classmethod
+    def render_key(
+        cls,
+        *parts: Any,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> str:
+        """计算渲染结果的缓存键，编码参数未指定时使用 ImageEncoder 当前默认值
+
+        参数:
+            parts: 参与计算的内容
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            str: 缓存键
+
+        异常:
+            Uncacheable: 参数无法计算稳定的哈希值
+        """
+        return cls.key(
+            *parts,
+            format or ImageEncoder.default_format,
+            quality or ImageEncoder.quality,
+            ImageEncoder.compress_level if compress_level is None else compress_level,
+            ImageEncoder.auto_policy,
+        )
+
+    @classmethod
+    async def get(cls, key: str) -> bytes | None:
+        """获取缓存，依次查找内存与磁盘
+
+        参数:
+            key: 缓存键
+
+        返回:
+            bytes | None: 编码后数据
+        """
+        now = time.time()
+        if (item := cls._memory.get(key)) is not None:
+            if not item[0] or item[0] > now:
+                cls._metrics["memory_hits"] += 1
+                return item[1]
+            cls._memory.pop(key)
+        if cls.disk_path and (item := await run_sync(cls._disk_get)(key)):
+            cls._memory.put(key, item)
+            cls._metrics["disk_hits"] += 1
+            return item[1]
+        return None
+
+    @classmethod
+    async def put(cls, key: str, data: bytes, ttl: float | None = None):
+        """写入缓存
+
+        参数:
+            key: 缓存键
+            data: 编码后数据
+            ttl: 有效期(秒)，为 0 时不过期.
+        """
+        ttl = cls.default_ttl if ttl is None else ttl
+        expire = time.time() + ttl if ttl else 0
+        cls._memory.put(key, (expire, data))
+        if cls.disk_path:
+            await run_sync(cls._disk_put)(key, expire, data)
+
+    @classmethod
+    async def get_or_render(
+        cls,
+        key: str,
+        render: Callable[[], Awaitable[bytes]],
+        ttl: float | None = None,
+    ) -> bytes:
+        """获取缓存，未命中时渲染并写入，相同键的并发请求只渲染一次
+
+        参数:
+            key: 缓存键
+            render: 渲染并编码的函数
+            ttl: 有效期(秒).
+
+        返回:
+            bytes: 编码后数据
+        """
+        if not cls.enable:
+            return await render()
+        if (data := await cls.get(key)) is not None:
+            return data
+        if (future := cls._inflight.get(key)) is not None:
+            cls._metrics["shared"] += 1
+            await asyncio.wait([future])
+            if future.cancelled():
+                # 渲染方被取消时重新渲染
+                return await cls.get_or_render(key, render, ttl)
+            return future.result()
+        cls._metrics["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        cls._inflight[key] = future
+        try:
+            data = await render()
+            await cls.put(key, data, ttl)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # 没有等待方时避免 Future exception was never retrieved
+            future.exception()
+            raise
+        else:
+            future.set_result(data)
+        finally:
+            cls._inflight.pop(key, None)
+        return data
+
+    @classmethod
+    def cached(
+        cls,
+        ttl: float | None = None,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+    ) -> Callable[
+        [Callable[P, Awaitable[BuildImage]]], Callable[P, Coroutine[Any, Any, bytes]]
+    ]:
+        """缓存模板函数结果的装饰器，被装饰函数改为返回编码后数据
+
+        参数中包含 lambda 或局部函数等无法计算哈希值的内容时不使用缓存
+
+        参数:
+            ttl: 有效期(秒)，为 0 时不过期.
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+
+        返回:
+            Callable: 装饰器
+        """
+
+        def decorator(
+            func: Callable[P, Awaitable[BuildImage]],
+        ) -> Callable[P, Coroutine[Any, Any, bytes]]:
+            @wraps(func)
+            async def wrapper(*args: P.args, **kwargs: P.kwargs) -> bytes:
+                async def render() -> bytes:
+                    image = await func(*args, **kwargs)
+                    return await image.pic2bytes_async(format, quality, compress_level)
+
+                try:
+                    key = cls.render_key(
+                        func,
+                        args,
+                        kwargs,
+                        format=format,
+                        quality=quality,
+                        compress_level=compress_level,
+                    )
+                except Uncacheable as e:
+                    cls._metrics["bypass"] += 1
+                    logger.debug(f"渲染结果不缓存: {e}")
+                    return await render()
+                return await cls.get_or_render(key, render, ttl)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 内存条目数量与占用字节数，磁盘占用字节数，各类命中次数
+        """
+        disk = cls._disk_index or {}
+        return {
+            "size": len(cls._memory),
+            "bytes": cls._memory.current_bytes,
+            "disk_files": len(disk),
+            "disk_bytes": sum(size for size, _ in disk.values()),
+            **cls._metrics,
+        }
+
+    @classmethod
+    def clear(cls, disk: bool = False):
+        """清空内存缓存，统计与字体目录指纹
+
+        参数:
+            disk: 是否同时删除磁盘缓存文件.
+        """
+        cls._memory.clear()
+        _fingerprints.clear()
+        for key in cls._metrics:
+            cls._metrics[key] = 0
+        if disk and cls.disk_path:
+            with cls._disk_lock:
+                for file in cls.disk_path.glob("*.bin"):
+                    file.unlink(missing_ok=True)
+                cls._disk_index = {}
+
+    @classmethod
+    def _index(cls) -> dict[str, tuple[int, float]]:
+        """磁盘缓存索引，需持有 _disk_lock"""
+        if cls._disk_index is None:
+            cls._disk_index = {}
+            if cls.disk_path:
+                for file in cls.disk_path.glob("*.bin"):
+                    with contextlib.suppress(OSError):
+                        stat = file.stat()
+                        cls._disk_index[file.stem] = (stat.st_size, stat.st_mtime)
+        return cls._disk_index
+
+    @classmethod
+    def _disk_get(cls, key: str) -> tuple[float, bytes] | None:
+        """读取磁盘缓存，过期时删除"""
+        assert cls.disk_path
+        file = cls.disk_path / f"{key}.bin"
+        with cls._disk_lock:
+            index = cls._index()
+            if key not in index:
+                return None
+            try:
+                raw = file.read_bytes()
+            except OSError:
+                index.pop(key, None)
+                return None
+            expire = _HEADER.unpack_from(raw)[0] if len(raw) >= _HEADER.size else -1
+            if expire < 0 or (expire and expire <= time.time()):
+                file.unlink(missing_ok=True)
+                index.pop(key, None)
+                return None
+            # 更新修改时间，淘汰时按最近使用时间排序
+            with contextlib.suppress(OSError):
+                os.utime(file)
+            index[key] = (len(raw), time.time())
+        return expire, raw[_HEADER.size :]
+
+    @classmethod
+    def _disk_put(cls, key: str, expire: float, data: bytes):
+        """写入磁盘缓存，超出大小限制时删除最久未使用的文件"""
+        assert cls.disk_path
+        file = cls.disk_path / f"{key}.bin"
+        tmp = file.with_suffix(f".{threading.get_ident()}.tmp")
+        raw = _HEADER.pack(expire) + data
+        if len(raw) > cls.disk_max_bytes:
+            return
+        with cls._disk_lock:
+            index = cls._index()
+            try:
+                tmp.write_bytes(raw)
+                os.replace(tmp, file)
+            except OSError as e:
+                tmp.unlink(missing_ok=True)
+                logger.warning(f"写入渲染缓存失败: {e}")
+                return
+            index[key] = (len(raw), time.time())
+            total = sum(size for size, _ in index.values())
+            if total <= cls.disk_max_bytes:
+                return
+            for old, (size, _) in sorted(index.items(), key=lambda x: x[1][1]):
+                if total <= cls.disk_max_bytes:
+                    break
+                (cls.disk_path / f"{old}.bin").unlink(missing_ok=True)
+                index.pop(old)
+                total -= size
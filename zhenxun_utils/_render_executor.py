@@ -0,0 +1,264 @@
+import asyncio
+import contextlib
+import contextvars
+import itertools
+import os
+import queue
+import threading
+import time
+from collections.abc import Callable, Coroutine, Iterator
+from concurrent.futures import CancelledError, Future
+from functools import partial, wraps
+from typing import Any, Literal, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+R = TypeVar("R")
+
+RenderPriority = Literal["high", "normal", "low"]
+"""
+渲染优先级
+
+high: 交互回复
+
+normal: 默认
+
+low: 后台任务
+"""
+
+PRIORITY_VALUE: dict[RenderPriority, int] = {"high": 0, "normal": 1, "low": 2}
+
+
+class RenderCancelled(CancelledError):
+    """
+    渲染任务已取消
+    """
+
+
+class _Job:
+    """
+    渲染任务
+    """
+
+    __slots__ = ("cancelled", "context", "enqueued", "func", "future")
+
+    def __init__(self, func: Callable[[], Any]) -> None:
+        self.func = func
+        # 提交时的上下文，RenderProfile 等 ContextVar 会传递至线程
+        self.context = contextvars.copy_context()
+        self.future: Future = Future()
+        self.enqueued = time.perf_counter()
+        # 等待方已取消，执行中的任务在两次绘图操作之间检查
+        self.cancelled = False
+
+    def run(self):
+        token = _current_job.set(self)
+        try:
+            result = self.func()
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+        finally:
+            _current_job.reset(token)
+
+
+_current_job: contextvars.ContextVar[_Job | None] = contextvars.ContextVar(
+    "render_job", default=None
+)
+_priority: contextvars.ContextVar[RenderPriority] = contextvars.ContextVar(
+    "render_priority", default="normal"
+)
+
+
+class RenderExecutor:
+    """
+    渲染线程池
+
+    BuildImage 的绘图操作与编码在该线程池中执行，不占用默认线程池，
+    任务按优先级排队，等待方取消(如超时)后排队中的任务不再执行，
+    执行中的任务在两次绘图操作之间停止
+    """
+
+    max_workers: int = min(4, os.cpu_count() or 1)
+    """线程数量"""
+    _queue: "queue.PriorityQueue[tuple[int, int, _Job | None]]" = queue.PriorityQueue()
+    _threads: list[threading.Thread] = []  # noqa: RUF012
+    _counter = itertools.count()
+    _lock = threading.Lock()
+    _metrics: dict[str, float] = {  # noqa: RUF012
+        "submitted": 0,
+        "completed": 0,
+        "cancelled": 0,
+        "max_depth": 0,
+        "wait_total": 0.0,
+        "wait_max": 0.0,
+    }
+
+    @classmethod
+    def configure(cls, max_workers: int | None = None):
+        """设置线程数量，等待已启动的线程完成当前任务后退出，排队中的任务由新线程执行
+
+        参数:
+            max_workers: 线程数量.
+        """
+        if max_workers is not None:
+            if max_workers < 1:
+                raise ValueError("线程数量必须大于 0...")
+            cls.shutdown(wait=True)
+            with cls._lock:
+                cls.max_workers = max_workers
+                if not cls._queue.empty():
+                    cls._start_workers()
+
+    @classmethod
+    @contextlib.contextmanager
+    def priority(cls, priority: RenderPriority) -> Iterator[None]:
+        """设置 with 块内提交的渲染任务优先级
+
+        参数:
+            priority: 优先级
+
+        用法:
+            with RenderExecutor.priority("low"):
+                image = await ImageTemplate.table_page(...)
+        """
+        token = _priority.set(priority)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    @classmethod
+    async def run(cls, func: Callable[P, R], *args: P.args, **kwargs: P.kwargs) -> R:
+        """在渲染线程池中执行函数
+
+        参数:
+            func: 函数
+            args: 参数
+            kwargs: 参数
+
+        返回:
+            R: 函数返回值
+        """
+        job = _Job(partial(func, *args, **kwargs))
+        cls._submit(job)
+        try:
+            return await asyncio.wrap_future(job.future)
+        except asyncio.CancelledError:
+            job.cancelled = True
+            raise
+
+    @classmethod
+    def check_cancelled(cls):
+        """在渲染线程中检查当前任务是否已被取消
+
+        异常:
+            RenderCancelled: 任务已取消
+        """
+        job = _current_job.get()
+        if job is not None and job.cancelled:
+            raise RenderCancelled
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """线程池统计
+
+        返回:
+            dict[str, Any]: 线程数量，排队数量，最大排队数量，
+                提交/完成/取消数量，平均与最大等待时间(秒)
+        """
+        with cls._lock:
+            metrics = dict(cls._metrics)
+        started = metrics["completed"] + metrics["cancelled"]
+        return {
+            "workers": len(cls._threads),
+            "depth": cls._queue.qsize(),
+            "max_depth": int(metrics["max_depth"]),
+            "submitted": int(metrics["submitted"]),
+            "completed": int(metrics["completed"]),
+            "cancelled": int(metrics["cancelled"]),
+            "wait_avg": metrics["wait_total"] / started if started else 0.0,
+            "wait_max": metrics["wait_max"],
+        }
+
+    @classmethod
+    def reset_stats(cls):
+        """清空统计"""
+        with cls._lock:
+            for key in cls._metrics:
+                cls._metrics[key] = 0
+
+    @classmethod
+    def shutdown(cls, wait: bool = False):
+        """停止全部线程，线程完成当前任务后退出，不再获取排队中的任务，
+        排队中的任务由之后提交任务时重新启动的线程执行
+
+        参数:
+            wait: 是否等待线程退出.
+        """
+        with cls._lock:
+            threads, cls._threads = cls._threads, []
+            for _ in threads:
+                # 优先级高于所有任务，线程完成当前任务后立即退出
+                cls._queue.put((-1, next(cls._counter), None))
+        if wait:
+            current = threading.current_thread()
+            for thread in threads:
+                if thread is not current:
+                    thread.join()
+
+    @classmethod
+    def _submit(cls, job: _Job):
+        """提交任务，首次提交时启动线程"""
+        with cls._lock:
+            cls._start_workers()
+            cls._queue.put((PRIORITY_VALUE[_priority.get()], next(cls._counter), job))
+            cls._metrics["submitted"] += 1
+            cls._metrics["max_depth"] = max(
+                cls._metrics["max_depth"], cls._queue.qsize()
+            )
+
+    @classmethod
+    def _start_workers(cls):
+        """启动线程至 max_workers 个，需持有 _lock"""
+        for _ in range(cls.max_workers - len(cls._threads)):
+            thread = threading.Thread(
+                target=cls._worker, name="zhenxun-render", daemon=True
+            )
+            thread.start()
+            cls._threads.append(thread)
+
+    @classmethod
+    def _worker(cls):
+        """线程主循环"""
+        while True:
+            _, _, job = cls._queue.get()
+            if job is None:
+                return
+            wait = time.perf_counter() - job.enqueued
+            if job.cancelled or not job.future.set_running_or_notify_cancel():
+                with cls._lock:
+                    cls._metrics["cancelled"] += 1
+                continue
+            job.context.run(job.run)
+            with cls._lock:
+                cls._metrics["cancelled" if job.cancelled else "completed"] += 1
+                cls._metrics["wait_total"] += wait
+                cls._metrics["wait_max"] = max(cls._metrics["wait_max"], wait)
+
+
+def render_sync(func: Callable[P, R]) -> Callable[P, Coroutine[None, None, R]]:
+    """将同步函数包装为在渲染线程池中执行的异步函数，用法同 nonebot.utils.run_sync
+
+    参数:
+        func: 同步函数
+
+    返回:
+        Callable[P, Coroutine[None, None, R]]: 异步函数
+    """
+
+    @wraps(func)
+    async def _wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+        return await RenderExecutor.run(func, *args, **kwargs)
+
+    return _wrapper
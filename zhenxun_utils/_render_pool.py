@@ -0,0 +1,209 @@
+import asyncio
+import contextlib
+import importlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from nonebot import logger
+from pydantic import BaseModel
+
+from ._build_image import BuildImage
+from ._build_mat import BuildMat, BuildMatData
+from ._image_encoder import EncodeFormat
+from ._render_cache import RenderCache, Uncacheable
+
+
+class RenderJob(BaseModel):
+    """
+    渲染任务，需可被 pickle 以发送至子进程
+    """
+
+    template: str
+    """模板导入路径 module:qualname"""
+    kwargs: dict[str, Any] = {}
+    """模板参数"""
+    format: EncodeFormat | None = None
+    """输出格式"""
+    quality: int | None = None
+    """JPEG/WEBP 质量"""
+    compress_level: int | None = None
+    """PNG 压缩等级"""
+
+
+async def render_mat(**data: Any) -> BuildImage:
+    """根据 BuildMatData 参数构造图表
+
+    参数:
+        data: BuildMatData 参数
+
+    返回:
+        BuildImage: 图表
+    """
+    mat = BuildMat(data["mat_type"])
+    mat.build_data = BuildMatData(**data)
+    return await mat.build()
+
+
+def resolve_template(path: str) -> Any:
+    """根据 module:qualname 导入模板
+
+    参数:
+        path: 导入路径
+
+    返回:
+        Any: 模板函数
+    """
+    module, _, qualname = path.partition(":")
+    obj: Any = importlib.import_module(module)
+    for name in qualname.split("."):
+        obj = getattr(obj, name)
+    return obj
+
+
+async def execute_job(job: RenderJob) -> bytes:
+    """执行渲染任务并编码
+
+    参数:
+        job: 渲染任务
+
+    返回:
+        bytes: 编码后数据
+    """
+    image: BuildImage = await resolve_template(job.template)(**job.kwargs)
+    return await image.pic2bytes_async(job.format, job.quality, job.compress_level)
+
+
+def _run_job(job: RenderJob) -> bytes:
+    """子进程入口"""
+    return asyncio.run(execute_job(job))
+
+
+def _init_worker(fonts: list[tuple[str, int]]):
+    """子进程预热，导入模板并预加载字体"""
+    importlib.import_module(f"{__package__}.image_utils")
+    for font, size in fonts:
+        with contextlib.suppress(OSError):
+            BuildImage.load_font(font, size)
+
+
+class RenderPool:
+    """
+    多进程渲染
+
+    将模板名与参数发送至进程池渲染并返回编码后的数据，未启动进程池时在当前进程渲染
+    """
+
+    templates: dict[str, str] = {  # noqa: RUF012
+        "text2image": f"{__package__}.image_utils:text2image",
+        "table_page": f"{__package__}._image_template:ImageTemplate.table_page",
+        "hl_page": f"{__package__}._image_template:ImageTemplate.hl_page",
+        "build_mat": f"{__name__}:render_mat",
+    }
+    """已注册的模板"""
+    preload_fonts: list[tuple[str, int]] = [  # noqa: RUF012
+        ("HYWenHei-85W.ttf", 10),
+        ("HYWenHei-85W.ttf", 20),
+        ("HYWenHei-85W.ttf", 50),
+    ]
+    """子进程启动时预加载的字体"""
+    _executor: ProcessPoolExecutor | None = None
+
+    @classmethod
+    def register(cls, name: str, template: Any):
+        """注册模板，模板需为模块顶层可导入的异步函数或类方法，返回 BuildImage
+
+        参数:
+            name: 模板名称
+            template: 模板函数或 module:qualname 导入路径
+        """
+        if not isinstance(template, str):
+            template = f"{template.__module__}:{template.__qualname__}"
+        cls.templates[name] = template
+
+    @classmethod
+    def start(cls, workers: int = 2):
+        """启动进程池
+
+        参数:
+            workers: 进程数量.
+        """
+        cls.shutdown()
+        if workers > 0:
+            cls._executor = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(cls.preload_fonts,),
+            )
+
+    @classmethod
+    def shutdown(cls, wait: bool = False):
+        """关闭进程池
+
+        参数:
+            wait: 是否等待任务完成.
+        """
+        if cls._executor:
+            cls._executor.shutdown(wait=wait, cancel_futures=True)
+            cls._executor = None
+
+    @classmethod
+    async def render(
+        cls,
+        template: str,
+        format: EncodeFormat | None = None,
+        quality: int | None = None,
+        compress_level: int | None = None,
+        cache_ttl: float | None = None,
+        **kwargs: Any,
+    ) -> bytes:
+        """渲染模板
+
+        参数:
+            template: 模板名称或 module:qualname 导入路径
+            format: 输出格式.
+            quality: JPEG/WEBP 质量.
+            compress_level: PNG 压缩等级.
+            cache_ttl: 设置后通过 RenderCache 缓存结果，为有效期(秒)，0 为不过期.
+            kwargs: 模板参数，使用进程池时需可被 pickle
+
+        返回:
+            bytes: 编码后数据
+        """
+        job = RenderJob(
+            template=cls.templates.get(template, template),
+            kwargs=kwargs,
+            format=format,
+            quality=quality,
+            compress_level=compress_level,
+        )
+        if cache_ttl is not None:
+            try:
+                key = RenderCache.render_key(
+                    job,
+                    format=format,
+                    quality=quality,
+                    compress_level=compress_level,
+                )
+            except Uncacheable:
+                pass
+            else:
+                return await RenderCache.get_or_render(
+                    key, lambda: cls._render(job), cache_ttl
+                )
+        return await cls._render(job)
+
+    @classmethod
+    async def _render(cls, job: RenderJob) -> bytes:
+        """在进程池或当前进程中执行渲染任务"""
+        if cls._executor:
+            try:
+                return await asyncio.get_running_loop().run_in_executor(
+                    cls._executor, _run_job, job
+                )
+            except BrokenProcessPool:
+                logger.warning("渲染进程池异常退出，改为在当前进程渲染...")
+                cls._executor = None
+        return await execute_job(job)
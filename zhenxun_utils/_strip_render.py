@@ -0,0 +1,332 @@
+import bisect
+import struct
+import zlib
+from collections.abc import Iterator
+from io import BytesIO
+from pathlib import Path
+from typing import IO, Literal
+
+from PIL import Image, ImageChops
+from PIL.Image import Image as tImage
+from typing_extensions import Self
+
+from ._build_image import BuildImage, ColorAlias, paste_image
+from ._render_executor import RenderExecutor, render_sync
+
+PNG_COLOR_TYPE = {"L": 0, "RGB": 2, "RGBA": 6}
+"""PNG 颜色类型"""
+
+
+def _png_chunk(tag: bytes, data: bytes) -> bytes:
+    """构造 PNG 数据块"""
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
+
+
+class StripRenderer:
+    """
+    分条渲染器
+
+    记录超长图片中每张子图的位置，按水平条带依次合成并编码，
+    峰值内存只与条带大小相关，也可以按最大高度拆分为多页
+    """
+
+    strip_height: int = 256
+    """默认条带高度"""
+
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        color: ColorAlias = None,
+        mode: Literal["L", "RGB", "RGBA"] = "RGBA",
+        background: tImage | None = None,
+        strip_height: int | None = None,
+    ) -> None:
+        """
+        参数:
+            width: 宽度
+            height: 高度
+            color: 背景颜色，默认为白色.
+            mode: 图片类型.
+            background: 背景图片，按比例拉伸至整张图片.
+            strip_height: 条带高度.
+
+        异常:
+            ValueError: 长度或宽度为空，背景颜色与图片类型不匹配
+        """
+        if not width or not height:
+            raise ValueError("长度和宽度不能为空...")
+        if color is None:
+            color = 255 if mode == "L" else (255, 255, 255)
+        try:
+            Image.new(mode, (1, 1), color)  # type: ignore
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"背景颜色 {color} 与图片类型 {mode} 不匹配...") from e
+        self.width = width
+        self.height = height
+        self.color = color
+        self.mode = mode
+        self.background = background
+        self.strip_height = strip_height or self.strip_height
+        # 子图与坐标，按贴图顺序
+        self.items: list[tuple[tImage | BuildImage, tuple[int, int]]] = []
+        # 按纵坐标排序的子图下标，用于二分查找与条带相交的子图
+        self._ys: list[int] = []
+        self._order: list[int] = []
+        self._max_height = 0
+        # 分页后在原图中的起始高度
+        self._offset = 0
+        # 原图高度，用于拉伸背景
+        self._full_height = height
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return self.width, self.height
+
+    def paste(self, image: BuildImage | tImage, pos: tuple[int, int]) -> Self:
+        """记录贴图，在渲染时才会真正合成，BuildImage 中录制的操作会先执行
+
+        参数:
+            image: BuildImage 或 Image
+            pos: 坐标
+
+        返回:
+            StripRenderer: Self
+        """
+        if isinstance(image, BuildImage):
+            image.flush_sync()
+        self.items.append((image, pos))
+        return self
+
+    def render_region(self, top: int, bottom: int) -> tImage:
+        """合成指定高度区间
+
+        参数:
+            top: 起始高度
+            bottom: 结束高度
+
+        返回:
+            tImage: 区间图片
+        """
+        band = Image.new(self.mode, (self.width, bottom - top), self.color)  # type: ignore
+        if self.background:
+            scale = self.background.height / self._full_height
+            source_top = (top + self._offset) * scale
+            source_bottom = (bottom + self._offset) * scale
+            region = self.background.resize(
+                band.size,
+                Image.Resampling.BILINEAR,
+                box=(0, source_top, self.background.width, source_bottom),
+            )
+            paste_image(band, region, (0, 0))
+        if len(self._order) != len(self.items):
+            self._build_index()
+        start = bisect.bisect_right(self._ys, top - self._max_height)
+        end = bisect.bisect_left(self._ys, bottom)
+        for index in sorted(self._order[start:end]):
+            image, (x, y) = self.items[index]
+            opaque = False
+            _image = image
+            if isinstance(image, BuildImage):
+                _image, opaque = image.view, image.opaque
+            if y + _image.height > top:
+                paste_image(band, _image, (x, y - top), opaque)
+        return band
+
+    def _build_index(self):
+        """按纵坐标排序子图下标，相交的子图仍按贴图顺序合成"""
+        self._order = sorted(range(len(self.items)), key=lambda i: self.items[i][1][1])
+        self._ys = [self.items[i][1][1] for i in self._order]
+        self._max_height = max((image.height for image, _ in self.items), default=0)
+
+    def iter_strips(self) -> Iterator[tuple[int, tImage]]:
+        """依次合成每个条带
+
+        返回:
+            Iterator[tuple[int, tImage]]: 条带起始高度, 条带图片
+        """
+        for top in range(0, self.height, self.strip_height):
+            yield (
+                top,
+                self.render_region(top, min(top + self.strip_height, self.height)),
+            )
+
+    def save(self, fp: IO[bytes] | str | Path, compress_level: int = 6):
+        """按条带流式编码为 PNG
+
+        参数:
+            fp: 文件对象或路径
+            compress_level: 压缩等级.
+        """
+        if isinstance(fp, str | Path):
+            with open(fp, "wb") as f:
+                return self.save(f, compress_level)
+        fp.write(b"\x89PNG\r\n\x1a\n")
+        fp.write(
+            _png_chunk(
+                b"IHDR",
+                struct.pack(
+                    ">IIBBBBB",
+                    self.width,
+                    self.height,
+                    8,
+                    PNG_COLOR_TYPE[self.mode],
+                    0,
+                    0,
+                    0,
+                ),
+            )
+        )
+        compressor = zlib.compressobj(compress_level)
+        stride = self.width * len(self.mode)
+        previous_row = Image.new(self.mode, (self.width, 1), 0)  # type: ignore
+        for _, strip in self.iter_strips():
+            RenderExecutor.check_cancelled()
+            # Up 过滤: 每行减去上一行
+            shifted = Image.new(self.mode, strip.size, 0)  # type: ignore
+            shifted.paste(previous_row, (0, 0))
+            shifted.paste(strip.crop((0, 0, self.width, strip.height - 1)), (0, 1))
+            previous_row = strip.crop((0, strip.height - 1, self.width, strip.height))
+            data = ImageChops.subtract_modulo(strip, shifted).tobytes()
+            raw = b"".join(
+                b"\x02" + data[i : i + stride] for i in range(0, len(data), stride)
+            )
+            if compressed := compressor.compress(raw):
+                fp.write(_png_chunk(b"IDAT", compressed))
+        fp.write(_png_chunk(b"IDAT", compressor.flush()))
+        fp.write(_png_chunk(b"IEND", b""))
+
+    def pic2bytes(self, compress_level: int = 6) -> bytes:
+        """获取 PNG bytes
+
+        参数:
+            compress_level: 压缩等级.
+
+        返回:
+            bytes: bytes
+        """
+        buf = BytesIO()
+        self.save(buf, compress_level)
+        return buf.getvalue()
+
+    async def pic2bytes_async(self, compress_level: int = 6) -> bytes:
+        """在 RenderExecutor 中获取 PNG bytes
+
+        参数:
+            compress_level: 压缩等级.
+
+        返回:
+            bytes: bytes
+        """
+        return await render_sync(self.pic2bytes)(compress_level)
+
+    def to_image(self) -> BuildImage:
+        """合成为完整的 BuildImage，适用于分页后高度有限的页面
+
+        返回:
+            BuildImage: BuildImage
+        """
+        return BuildImage(background=self.render_region(0, self.height))
+
+    def paginate(self, max_height: int) -> list["StripRenderer"]:
+        """按最大高度拆分为多页，优先在子图之间的空隙处分页
+
+        参数:
+            max_height: 每页最大高度
+
+        返回:
+            list[StripRenderer]: 页面列表
+        """
+        if self.height <= max_height:
+            return [self]
+        intervals = []
+        for image, (_, y) in self.items:
+            intervals.append((y, y + image.height))
+        intervals.sort()
+        # 不会切断任何子图的分页位置
+        candidates = sorted(
+            {0, self.height}
+            | {top for top, _ in intervals}
+            | {bottom for _, bottom in intervals}
+        )
+        safe_cuts = []
+        index = 0
+        reach = 0
+        for cut in candidates:
+            while index < len(intervals) and intervals[index][0] < cut:
+                reach = max(reach, intervals[index][1])
+                index += 1
+            if reach <= cut:
+                safe_cuts.append(cut)
+        pages = []
+        start = 0
+        while start < self.height:
+            limit = min(start + max_height, self.height)
+            i = bisect.bisect_right(safe_cuts, limit) - 1
+            end = safe_cuts[i] if i >= 0 and safe_cuts[i] > start else limit
+            pages.append(self._page(start, end))
+            start = end
+        return pages
+
+    def pages(self, max_height: int, compress_level: int = 6) -> list[bytes]:
+        """拆分为多页并编码
+
+        参数:
+            max_height: 每页最大高度
+            compress_level: 压缩等级.
+
+        返回:
+            list[bytes]: 每页 PNG bytes
+        """
+        return [page.pic2bytes(compress_level) for page in self.paginate(max_height)]
+
+    def _page(self, top: int, bottom: int) -> "StripRenderer":
+        """截取指定高度区间为新页面"""
+        page = self.__class__(
+            self.width,
+            bottom - top,
+            self.color,
+            self.mode,
+            self.background,
+            self.strip_height,
+        )
+        page._offset = self._offset + top
+        page._full_height = self._full_height
+        for image, (x, y) in self.items:
+            if y < bottom and y + image.height > top:
+                page.paste(image, (x, y - top))
+        return page
+
+    @classmethod
+    def auto_paste(
+        cls,
+        img_list: list[BuildImage | tImage],
+        row: int,
+        space: int = 10,
+        padding: int = 50,
+        color: ColorAlias = None,
+        background: tImage | None = None,
+    ) -> "StripRenderer":
+        """BuildImage.auto_paste 的分条渲染版本
+
+        参数:
+            img_list: 图片列表
+            row: 一行图片的数量
+            space: 图片之间的间距.
+            padding: 外边距.
+            color: 图片背景颜色，默认为白色.
+            background: 图片背景图片.
+
+        返回:
+            StripRenderer: StripRenderer
+        """
+        size, positions = BuildImage.auto_paste_layout(img_list, row, space, padding)
+        renderer = cls(*size, color=color, background=background)
+        for img, pos in zip(img_list, positions):
+            renderer.paste(img, pos)
+        return renderer
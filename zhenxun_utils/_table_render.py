@@ -0,0 +1,428 @@
+from collections.abc import Callable, Sequence
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from PIL import Image, ImageDraw
+from PIL.Image import Image as tImage
+from PIL.ImageFont import FreeTypeFont
+
+from ._build_image import BuildImage, paste_image, paste_method
+from ._render_executor import RenderExecutor
+from ._text_measure import TextMeasure, TextSprite
+
+if TYPE_CHECKING:
+    from ._image_template import RowStyle
+
+TableCell = str | tuple[Path | bytes | BuildImage, int, int]
+"""单元格，文本或 (图片, 宽, 高)"""
+
+
+class TableLayout(NamedTuple):
+    """
+    表格布局
+    """
+
+    size: tuple[int, int]
+    """画布尺寸"""
+    columns: list[tuple[int, int]]
+    """每列的 (横坐标, 宽度)"""
+    top: int
+    """列区域顶部纵坐标"""
+    column_height: int
+    """列区域高度"""
+    header_height: int
+    """表头高度"""
+    row_top: int
+    """第一行纵坐标"""
+    row_height: int
+    """行高(含行间距)"""
+
+
+class _Text(NamedTuple):
+    pos: tuple[int, int]
+    text: str
+    fill: Any
+    font: FreeTypeFont
+    clip: tuple[int, int, int, int]
+
+
+class _Header(NamedTuple):
+    pos: tuple[int, int]
+    text: str
+    fill: Any
+    font: FreeTypeFont
+    box: tuple[int, int, int, int]
+
+
+class _Image(NamedTuple):
+    pos: tuple[int, int]
+    image: BuildImage | Path | bytes
+    size: tuple[int, int]
+    clip: tuple[int, int, int, int]
+
+
+class TableRenderer:
+    """
+    单画布表格渲染
+
+    先测量全部单元格计算列宽与行高，再在一次 RenderExecutor 调度中
+    将表头与单元格直接绘制到同一张画布上，布局与逐列绘制后拼接的结果一致，
+    超出所在列的内容同样会被裁剪
+    """
+
+    font: str = "HYWenHei-85W.ttf"
+    """默认字体"""
+    font_size: int = 20
+    """默认字体大小"""
+    header_color: str = "#C8CCCF"
+    """表头文字颜色"""
+    margin: int = 50
+    """表格外边距"""
+
+    @classmethod
+    def normalize(cls, row: Sequence[Any], count: int) -> list[TableCell]:
+        """将一行数据转换为单元格，文本转为 str，不足的列补空文本
+
+        参数:
+            row: 一行数据
+            count: 列数
+
+        返回:
+            list[TableCell]: 单元格
+        """
+        cells: list[TableCell] = [
+            item if isinstance(item, tuple | list) else str(item)
+            for item in row[:count]
+        ]
+        cells.extend([""] * (count - len(cells)))
+        return cells
+
+    @classmethod
+    def measure(cls, cell: TableCell, font: FreeTypeFont) -> int:
+        """单元格内容宽度
+
+        参数:
+            cell: 单元格
+            font: 字体
+
+        返回:
+            int: 宽度
+        """
+        if isinstance(cell, tuple | list):
+            return cell[1]
+        return BuildImage.get_text_size(cell, font)[0]
+
+    @classmethod
+    def column_widths(
+        cls,
+        column_name: list[str],
+        rows: list[list[TableCell]],
+        font: FreeTypeFont,
+    ) -> list[int]:
+        """计算每列内容宽度(不含内间距)
+
+        参数:
+            column_name: 表头列表
+            rows: 单元格
+            font: 字体
+
+        返回:
+            list[int]: 每列宽度
+        """
+        widths = [BuildImage.get_text_size(name, font)[0] for name in column_name]
+        for row in rows:
+            for i, cell in enumerate(row):
+                if (w := cls.measure(cell, font)) > widths[i]:
+                    widths[i] = w
+        return widths
+
+    @classmethod
+    def layout(
+        cls,
+        column_name: list[str],
+        widths: list[int],
+        row_count: int,
+        font: FreeTypeFont,
+        row_space: int = 25,
+        column_space: int = 10,
+        padding: int = 5,
+    ) -> TableLayout:
+        """计算表格布局
+
+        参数:
+            column_name: 表头列表
+            widths: 每列内容宽度
+            row_count: 行数
+            font: 字体
+            row_space: 行间距.
+            column_space: 列间距.
+            padding: 文本内间距.
+
+        返回:
+            TableLayout: 表格布局
+
+        异常:
+            ValueError: 表头为空
+        """
+        if not column_name:
+            raise ValueError("表头不能为空...")
+        _, base_h = BuildImage.get_text_size("A", font)
+        header_height = max(
+            BuildImage.get_text_size(name, font)[1] if name.strip() else 1
+            for name in column_name
+        )
+        column_height = (base_h + row_space) * (row_count + 1) + padding * 2
+        columns = []
+        x = cls.margin
+        for width in widths:
+            columns.append((x, width + padding * 2))
+            x += width + padding * 2 + column_space
+        size = (x - column_space + cls.margin, column_height + cls.margin * 2)
+        return TableLayout(
+            size,
+            columns,
+            cls.margin,
+            column_height,
+            header_height,
+            cls.margin + header_height + row_space + 20,
+            base_h + row_space,
+        )
+
+    @classmethod
+    async def render(
+        cls,
+        column_name: list[str],
+        data_list: Sequence[Sequence[Any]],
+        row_space: int = 25,
+        column_space: int = 10,
+        padding: int = 5,
+        text_style: Callable[[str, str], "RowStyle"] | None = None,
+        widths: list[int] | None = None,
+    ) -> BuildImage:
+        """渲染表格
+
+        参数:
+            column_name: 表头列表
+            data_list: 数据列表
+            row_space: 行间距.
+            column_space: 列间距.
+            padding: 文本内间距.
+            text_style: 文本样式.
+            widths: 每列内容宽度，为 None 时根据全部单元格计算.
+
+        返回:
+            BuildImage: 表格图片
+        """
+        font = BuildImage.load_font(cls.font, cls.font_size)
+        rows = [cls.normalize(row, len(column_name)) for row in data_list]
+        if widths is None:
+            widths = cls.column_widths(column_name, rows, font)
+        layout = cls.layout(
+            column_name, widths, len(rows), font, row_space, column_space, padding
+        )
+        commands = cls.header(layout, column_name, font)
+        commands.extend(
+            await cls.cells(layout, column_name, rows, 0, font, padding, text_style)
+        )
+        return await RenderExecutor.run(cls.draw, layout.size, commands)
+
+    @classmethod
+    def header(
+        cls, layout: TableLayout, column_name: list[str], font: FreeTypeFont
+    ) -> list[_Header | _Text | _Image]:
+        """表头绘制命令，表头在所在列内水平居中"""
+        commands: list[_Header | _Text | _Image] = []
+        for (x, width), name in zip(layout.columns, column_name):
+            if not name.strip():
+                continue
+            text_w, text_h = BuildImage.get_text_size(name, font)
+            line = max(name.split("\n"), key=len)
+            line_w, line_h = BuildImage.get_text_size(line, font)
+            left, top = x + int((width - text_w) / 2), layout.top + 20
+            pos = (
+                left + int((text_w - line_w) / 2),
+                top + int((text_h - line_h) / 2),
+            )
+            # 多行表头按最长一行居中，超出文本框的部分被裁剪
+            box = (left, top, left + text_w, top + text_h)
+            commands.append(_Header(pos, name, cls.header_color, font, box))
+        return commands
+
+    @classmethod
+    async def cells(
+        cls,
+        layout: TableLayout,
+        column_name: list[str],
+        rows: list[list[TableCell]],
+        start: int,
+        font: FreeTypeFont,
+        padding: int = 5,
+        text_style: Callable[[str, str], "RowStyle"] | None = None,
+    ) -> list[_Text | _Image]:
+        """单元格绘制命令
+
+        参数:
+            layout: 表格布局
+            column_name: 表头列表
+            rows: 单元格
+            start: 第一行在表格中的行号
+            font: 默认字体
+            padding: 文本内间距.
+            text_style: 文本样式.
+
+        返回:
+            list: 绘制命令
+        """
+        commands: list[_Text | _Image] = []
+        clips = [
+            (x, layout.top, x + width, layout.top + layout.column_height)
+            for x, width in layout.columns
+        ]
+        fonts: dict[tuple, FreeTypeFont] = {}
+        for r, row in enumerate(rows, start):
+            y = layout.row_top + r * layout.row_height
+            for i, cell in enumerate(row):
+                pos = (layout.columns[i][0] + padding, y)
+                if isinstance(cell, tuple | list):
+                    image, width, height = cell
+                    if isinstance(image, BuildImage):
+                        await image.flush()
+                    elif not isinstance(image, Path | bytes):
+                        continue
+                    commands.append(_Image(pos, image, (width, height), clips[i]))
+                    continue
+                fill, cell_font = (0, 0, 0), font
+                if text_style:
+                    style = text_style(column_name[i], cell)
+                    fill = style.font_color
+                    if isinstance(style.font, FreeTypeFont):
+                        cell_font = style.font
+                    elif style.font:
+                        key = (style.font, style.font_size)
+                        if (cell_font := fonts.get(key)) is None:
+                            cell_font = fonts[key] = BuildImage.load_font(
+                                style.font, style.font_size
+                            )
+                commands.append(_Text(pos, cell, fill, cell_font, clips[i]))
+        return commands
+
+    @classmethod
+    def draw(
+        cls, size: tuple[int, int], commands: list[_Header | _Text | _Image]
+    ) -> BuildImage:
+        """在白色画布上执行绘制命令
+
+        画布视为逐列绘制时的白色列，带透明度的内容以蒙版粘贴后像素变为半透明，
+        全部绘制完成后将这些区域再以自身为蒙版粘贴至白色背景，
+        与逐列绘制后拼接的混合结果一致
+
+        参数:
+            size: 画布尺寸
+            commands: 绘制命令
+
+        返回:
+            BuildImage: 表格图片
+        """
+        table = BuildImage(*size, (255, 255, 255))
+        canvas = table.markImg
+        dirty: tuple[int, int, int, int] | None = None
+        for command in commands:
+            RenderExecutor.check_cancelled()
+            if isinstance(command, _Header):
+                box = cls._draw_header(canvas, command)
+            elif isinstance(command, _Text):
+                cls._draw_text(canvas, command)
+                continue
+            else:
+                box = cls._draw_image(canvas, command)
+            if box and dirty:
+                dirty = (
+                    min(dirty[0], box[0]),
+                    min(dirty[1], box[1]),
+                    max(dirty[2], box[2]),
+                    max(dirty[3], box[3]),
+                )
+            else:
+                dirty = box or dirty
+        if dirty:
+            region = canvas.crop(dirty)
+            layer = Image.new("RGBA", region.size, (255, 255, 255, 255))
+            layer.paste(region, (0, 0), region)
+            canvas.paste(layer, dirty[:2])
+            # 边缘像素为半透明，重新赋值以更新 opaque
+            table.markImg = canvas
+        return table
+
+    @classmethod
+    def _draw_header(
+        cls, canvas: tImage, command: _Header
+    ) -> tuple[int, int, int, int]:
+        """绘制表头，文字绘制在透明文本图片上后以自身为蒙版粘贴
+
+        返回:
+            tuple[int, int, int, int]: 粘贴区域
+        """
+        pos, text, fill, font, box = command
+        text_image = Image.new("RGBA", (box[2] - box[0], box[3] - box[1]), (0, 0, 0, 0))
+        ImageDraw.Draw(text_image).text(
+            (pos[0] - box[0], pos[1] - box[1]), text, fill=fill, font=font
+        )
+        canvas.paste(text_image, box[:2], text_image)
+        return box
+
+    @classmethod
+    def _draw_text(cls, canvas: tImage, command: _Text):
+        """绘制文本，超出所在列时在列区域内绘制以裁剪"""
+        pos, text, fill, font, clip = command
+        if "\n" not in text:
+            box = TextMeasure.bbox(text, font)
+            if (
+                pos[0] + box[0] >= clip[0]
+                and pos[1] + box[1] >= clip[1]
+                and pos[0] + box[2] <= clip[2]
+                and pos[1] + box[3] <= clip[3]
+            ):
+                if not TextSprite.paste(canvas, pos, text, fill, font):
+                    ImageDraw.Draw(canvas).text(pos, text, fill=fill, font=font)
+                return
+        region = canvas.crop(clip)
+        pos = (pos[0] - clip[0], pos[1] - clip[1])
+        if not TextSprite.paste(region, pos, text, fill, font):
+            ImageDraw.Draw(region).text(pos, text, fill=fill, font=font)
+        canvas.paste(region, clip[:2])
+
+    @classmethod
+    def _draw_image(
+        cls, canvas: tImage, command: _Image
+    ) -> tuple[int, int, int, int] | None:
+        """粘贴图片，超出所在列的部分被裁剪
+
+        返回:
+            tuple[int, int, int, int] | None: 以蒙版粘贴时的粘贴区域
+        """
+        (x, y), source, (width, height), clip = command
+        if isinstance(source, BuildImage):
+            image, opaque = source.view, source.opaque
+        else:
+            loaded = BuildImage(
+                width,
+                height,
+                background=BytesIO(source) if isinstance(source, bytes) else source,
+            )
+            image, opaque = loaded.view, loaded.opaque
+        box = (
+            max(clip[0] - x, 0),
+            max(clip[1] - y, 0),
+            min(clip[2] - x, image.width),
+            min(clip[3] - y, image.height),
+        )
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return None
+        if box != (0, 0, image.width, image.height):
+            image = image.crop(box)
+        x, y = x + box[0], y + box[1]
+        paste_image(canvas, image, (x, y), opaque)
+        if paste_method(canvas, image, opaque) == "blit":
+            return None
+        return x, y, x + image.width, y + image.height
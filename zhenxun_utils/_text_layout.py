@@ -0,0 +1,220 @@
+import unicodedata
+from collections.abc import Callable, Iterable
+from typing import Any, NamedTuple
+
+from PIL.ImageFont import FreeTypeFont
+
+from ._text_markup import DEFAULT_STYLE, MarkupLine, TextStyle
+from ._text_measure import TextMeasure
+
+NO_BREAK_BEFORE = frozenset(
+    "!%),.:;?]}¢°’”‰′″℃、。〃々〆〉》」』】〕〗〙〟ー゛゜ゝゞ・ヽヾ"
+    "ぁぃぅぇぉっゃゅょゎゕゖァィゥェォッャュョヮヵヶ"
+    "！％），．：；？］｝～｡｣､･"
+    "–—…‥"
+)
+"""不能位于行首的字符(行首禁则)"""
+
+NO_BREAK_AFTER = frozenset("$(£¥‘“〈《「『【〔〖〘〝＄（［｛｢￡￥")
+"""不能位于行尾的字符(行尾禁则)"""
+
+
+def is_wide(char: str) -> bool:
+    """是否为全角字符(中日韩文字与全角符号)，全角字符前后均可换行
+
+    参数:
+        char: 字符
+
+    返回:
+        bool: 是否为全角字符
+    """
+    return unicodedata.east_asian_width(char) in ("W", "F")
+
+
+def can_break(prev: str, char: str) -> bool:
+    """两个字符之间是否可以换行
+
+    参数:
+        prev: 前一个字符
+        char: 后一个字符
+
+    返回:
+        bool: 是否可以换行
+    """
+    if prev in NO_BREAK_AFTER or char in NO_BREAK_BEFORE:
+        return False
+    return prev.isspace() or is_wide(prev) or is_wide(char)
+
+
+class LayoutRun(NamedTuple):
+    """
+    排版后的文本段
+    """
+
+    text: str
+    """文本"""
+    font: FreeTypeFont
+    """字体"""
+    fill: Any
+    """颜色"""
+    x: int
+    """相对行首的横坐标"""
+    y: int
+    """相对行顶部的纵坐标，不同字体的文本段按基线对齐"""
+
+
+class LayoutLine(NamedTuple):
+    """
+    排版后的一行
+    """
+
+    runs: tuple[LayoutRun, ...]
+    """文本段"""
+    width: int
+    """宽度"""
+    height: int
+    """高度(最大上升高度 + 最大下降高度)"""
+
+
+class TextLayout:
+    """
+    文本排版
+
+    使用 TextMeasure 缓存的字形步进宽度逐字累加，贪心换行，
+    每段文本只测量一次，排版耗时与字符数量成正比
+    """
+
+    @classmethod
+    def layout(
+        cls,
+        lines: Iterable[MarkupLine],
+        resolve: Callable[[TextStyle], tuple[FreeTypeFont, Any]],
+        max_width: int | None = None,
+    ) -> list[LayoutLine]:
+        """排版
+
+        参数:
+            lines: TextMarkup 解析得到的行
+            resolve: 根据样式获取 (字体, 颜色)，每种样式只调用一次
+            max_width: 最大行宽，为 None 时不自动换行.
+
+        返回:
+            list[LayoutLine]: 排版后的行
+        """
+        styles: dict[TextStyle, tuple[FreeTypeFont, Any]] = {}
+        font_metrics: dict[int, tuple[int, int]] = {}
+
+        def get_style(style: TextStyle) -> tuple[FreeTypeFont, Any]:
+            if (resolved := styles.get(style)) is None:
+                resolved = styles[style] = resolve(style)
+            return resolved
+
+        def get_metrics(font: FreeTypeFont) -> tuple[int, int]:
+            if (metrics := font_metrics.get(id(font))) is None:
+                metrics = font_metrics[id(font)] = font.getmetrics()
+            return metrics
+
+        result = []
+        default_font = get_style(DEFAULT_STYLE)[0]
+        for line in lines:
+            items = [(run.text, *get_style(run.style)) for run in line]
+            for segments, width in cls._wrap(items, max_width):
+                if not segments:
+                    ascent, descent = get_metrics(default_font)
+                    result.append(LayoutLine((), 0, ascent + descent))
+                    continue
+                ascent = max(get_metrics(font)[0] for _, font, _, _ in segments)
+                descent = max(get_metrics(font)[1] for _, font, _, _ in segments)
+                runs = tuple(
+                    LayoutRun(text, font, fill, x, ascent - get_metrics(font)[0])
+                    for text, font, fill, x in segments
+                )
+                result.append(LayoutLine(runs, width, ascent + descent))
+        return result
+
+    @classmethod
+    def size(cls, lines: list[LayoutLine], spacing: int = 0) -> tuple[int, int]:
+        """排版结果的宽高
+
+        参数:
+            lines: 排版后的行
+            spacing: 行间距.
+
+        返回:
+            tuple[int, int]: 宽, 高
+        """
+        if not lines:
+            return 0, 0
+        width = max(line.width for line in lines)
+        height = sum(line.height for line in lines) + spacing * (len(lines) - 1)
+        return width, height
+
+    @classmethod
+    def _wrap(
+        cls, items: list[tuple[str, FreeTypeFont, Any]], max_width: int | None
+    ) -> list[tuple[list[tuple[str, FreeTypeFont, Any, int]], int]]:
+        """对一行文本贪心换行
+
+        返回:
+            list: 每行的 ([(文本, 字体, 颜色, 横坐标)], 行宽)
+        """
+        chars: list[str] = []
+        # 每个字符所属的文本段
+        owners: list[int] = []
+        metrics = []
+        for index, (text, font, _) in enumerate(items):
+            chars.extend(text)
+            owners.extend([index] * len(text))
+            metrics.extend(TextMeasure.metrics(text, font))
+        total = len(chars)
+        breaks: list[tuple[int, int]] = []
+        start = 0
+        while start < total:
+            end = total
+            if max_width:
+                width = 0.0
+                last_break = -1
+                for i in range(start, total):
+                    if i > start and can_break(chars[i - 1], chars[i]):
+                        last_break = i
+                    width += metrics[i][0]
+                    if width > max_width and i > start:
+                        if chars[i].isspace():
+                            end = i
+                        elif last_break > start:
+                            end = last_break
+                        else:
+                            end = i
+                        break
+            next_start = end
+            if end < total:
+                # 换行处的空白字符不显示
+                while end > start and chars[end - 1].isspace():
+                    end -= 1
+                while next_start < total and chars[next_start].isspace():
+                    next_start += 1
+            breaks.append((start, end))
+            start = next_start
+        if not breaks:
+            breaks.append((0, 0))
+        result = []
+        for start, end in breaks:
+            segments = []
+            x = 0.0
+            i = start
+            while i < end:
+                owner = owners[i]
+                j = i
+                while j < end and owners[j] == owner:
+                    j += 1
+                _, font, fill = items[owner]
+                segments.append(("".join(chars[i:j]), font, fill, round(x)))
+                x += sum(m[0] for m in metrics[i:j])
+                i = j
+            width = x
+            if end > start:
+                # 最后一个字形超出步进宽度的部分
+                advance, box = metrics[end - 1]
+                width += max(box[2] - advance, 0)
+            result.append((segments, round(width)))
+        return result
@@ -0,0 +1,186 @@
+import re
+from typing import Any, NamedTuple
+
+from ._image_cache import LRUCache
+
+TAG_PATTERN = re.compile(r"<f(?=[\s>])([^<>]*)>|</f>")
+"""<f ...> 与 </f> 标签"""
+
+ATTR_PATTERN = re.compile(r"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"']+))""")
+"""标签属性 key=value，value 可使用引号"""
+
+ATTR_ALIAS = {
+    "font": "font",
+    "font_size": "font_size",
+    "fs": "font_size",
+    "font_color": "font_color",
+    "fc": "font_color",
+}
+"""属性别名"""
+
+
+class TextStyle(NamedTuple):
+    """
+    文本样式，为 None 时使用外层或默认样式
+    """
+
+    font: str | None = None
+    """字体"""
+    font_size: int | None = None
+    """字体大小"""
+    font_color: str | None = None
+    """字体颜色"""
+
+    def merge(self, other: "TextStyle") -> "TextStyle":
+        """使用 other 中不为 None 的属性覆盖
+
+        参数:
+            other: 内层样式
+
+        返回:
+            TextStyle: 合并后的样式
+        """
+        return TextStyle(
+            other.font if other.font is not None else self.font,
+            other.font_size if other.font_size is not None else self.font_size,
+            other.font_color if other.font_color is not None else self.font_color,
+        )
+
+
+class TextRun(NamedTuple):
+    """
+    样式相同的一段文本，不包含换行
+    """
+
+    text: str
+    """文本"""
+    style: TextStyle
+    """样式"""
+
+
+MarkupLine = tuple[TextRun, ...]
+"""一行文本"""
+
+DEFAULT_STYLE = TextStyle()
+
+
+class TextMarkup:
+    """
+    text2image 标签解析
+
+    单次扫描将 <f font=... fs=... fc=...>文本</f> 解析为按行划分的样式文本段，
+    支持嵌套标签，内层未设置的属性继承外层，未闭合的标签作用至文本末尾，
+    多余的 </f> 按原文输出，解析结果按文本缓存
+    """
+
+    _cache: LRUCache[str, tuple[MarkupLine, ...]] = LRUCache(max_size=256)
+    _attr_cache: LRUCache[str, TextStyle] = LRUCache(max_size=1024)
+
+    @classmethod
+    def has_markup(cls, text: str) -> bool:
+        """文本是否包含 <f> 标签
+
+        参数:
+            text: 文本
+
+        返回:
+            bool: 是否包含标签
+        """
+        return any(m.group(0) != "</f>" for m in TAG_PATTERN.finditer(text))
+
+    @classmethod
+    def parse(cls, text: str) -> tuple[MarkupLine, ...]:
+        """解析文本
+
+        参数:
+            text: 文本
+
+        返回:
+            tuple[MarkupLine, ...]: 每行的样式文本段，空行为空元组
+        """
+        if (lines := cls._cache.get(text)) is None:
+            lines = cls._parse(text)
+            cls._cache.put(text, lines)
+        return lines
+
+    @classmethod
+    def plain(cls, text: str) -> tuple[MarkupLine, ...]:
+        """不解析标签，按行划分为默认样式的文本段
+
+        参数:
+            text: 文本
+
+        返回:
+            tuple[MarkupLine, ...]: 每行的样式文本段
+        """
+        return tuple(
+            (TextRun(line, DEFAULT_STYLE),) if line else () for line in text.split("\n")
+        )
+
+    @classmethod
+    def parse_style(cls, attrs: str) -> TextStyle:
+        """解析标签属性
+
+        参数:
+            attrs: 属性文本，如 font=a.ttf fs=30 fc=red
+
+        返回:
+            TextStyle: 样式
+        """
+        if (style := cls._attr_cache.get(attrs)) is not None:
+            return style
+        values: dict[str, Any] = {}
+        for m in ATTR_PATTERN.finditer(attrs):
+            key = ATTR_ALIAS.get(m.group(1))
+            value = next(v for v in m.groups()[1:] if v is not None)
+            if key == "font_size":
+                try:
+                    value = min(max(int(value), 1), 1000)
+                except ValueError:
+                    continue
+            if key:
+                values[key] = value
+        style = TextStyle(**values)
+        cls._attr_cache.put(attrs, style)
+        return style
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._cache.clear()
+        cls._attr_cache.clear()
+
+    @classmethod
+    def _parse(cls, text: str) -> tuple[MarkupLine, ...]:
+        """单次扫描解析"""
+        lines: list[MarkupLine] = []
+        line: list[TextRun] = []
+        stack = [DEFAULT_STYLE]
+
+        def add(segment: str):
+            parts = segment.split("\n")
+            for i, part in enumerate(parts):
+                if i:
+                    lines.append(tuple(line))
+                    line.clear()
+                if part:
+                    if line and line[-1].style == stack[-1]:
+                        # 与上一段样式相同时合并
+                        line[-1] = TextRun(line[-1].text + part, stack[-1])
+                    else:
+                        line.append(TextRun(part, stack[-1]))
+
+        pos = 0
+        for m in TAG_PATTERN.finditer(text):
+            if m.group(0) == "</f>" and len(stack) == 1:
+                # 多余的闭合标签按原文输出
+                continue
+            add(text[pos : m.start()])
+            pos = m.end()
+            if m.group(0) == "</f>":
+                stack.pop()
+            else:
+                stack.append(stack[-1].merge(cls.parse_style(m.group(1))))
+        add(text[pos:])
+        lines.append(tuple(line))
+        return tuple(lines)
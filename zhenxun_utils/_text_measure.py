@@ -0,0 +1,306 @@
+import re
+from collections.abc import Hashable
+from typing import Any
+
+from PIL import Image, ImageDraw
+from PIL.ImageFont import FreeTypeFont
+
+from ._image_cache import LRUCache
+
+CJK_PATTERN = re.compile(
+    r"^[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\ufe30-\ufe4f\uff00-\uffef]+$"
+)
+"""可使用字形宽度累加计算的文本(中日韩字符与全角符号，无字距调整)"""
+
+GlyphMetrics = tuple[float, tuple[int, int, int, int]]
+"""字形度量 (步进宽度, 边界框)"""
+
+
+class TextMeasure:
+    """
+    文本测量，按 (字体, 文本) 缓存边界框
+
+    对纯中日韩文本，通过逐字缓存的字形步进宽度与边界框合成整段文本的边界框，
+    不必对新文本重新进行排版
+    """
+
+    _bbox_cache: LRUCache[tuple[Hashable, str], tuple[int, int, int, int]] = LRUCache(
+        max_size=20000
+    )
+    _glyph_cache: LRUCache[Hashable, dict[str, GlyphMetrics]] = LRUCache(max_size=64)
+    _draw = ImageDraw.Draw(Image.new("RGB", (1, 1), (255, 255, 255)))
+    glyph_hits: int = 0
+    """通过字形合成得到结果的次数"""
+
+    @classmethod
+    def font_key(cls, font: FreeTypeFont) -> Hashable | None:
+        """字体缓存键
+
+        参数:
+            font: 字体
+
+        返回:
+            Hashable | None: 缓存键，没有文件路径(如从 BytesIO 加载)的字体为 None，
+                字体回收后 id 可能被新字体复用，因此不缓存
+        """
+        if isinstance(font.path, str | bytes):
+            return (
+                font.path,
+                font.size,
+                font.index,
+                font.encoding,
+                font.layout_engine,
+            )
+        return None
+
+    @classmethod
+    def bbox(cls, text: str, font: FreeTypeFont | None) -> tuple[int, int, int, int]:
+        """获取文本边界框，与 ImageDraw.textbbox((0, 0), text, font) 结果一致
+
+        参数:
+            text: 文本
+            font: 字体，非 FreeTypeFont 或没有文件路径时不缓存
+
+        返回:
+            tuple[int, int, int, int]: 边界框
+        """
+        if (
+            not isinstance(font, FreeTypeFont)
+            or (font_key := cls.font_key(font)) is None
+        ):
+            return cls._draw.textbbox((0, 0), text, font=font)  # type: ignore
+        key = (font_key, text)
+        box = cls._bbox_cache.get(key)
+        if box is None:
+            if "\n" not in text and CJK_PATTERN.match(text):
+                box = cls._glyph_bbox(text, font)
+            if box is None:
+                box = cls._draw.textbbox((0, 0), text, font=font)  # type: ignore
+            cls._bbox_cache.put(key, box)  # type: ignore
+        return box  # type: ignore
+
+    @classmethod
+    def size(cls, text: str, font: FreeTypeFont | None) -> tuple[int, int]:
+        """获取文本边界框宽高
+
+        参数:
+            text: 文本
+            font: 字体
+
+        返回:
+            tuple[int, int]: 宽, 高
+        """
+        box = cls.bbox(text, font)
+        return box[2] - box[0], box[3] - box[1]
+
+    @classmethod
+    def length(cls, text: str, font: FreeTypeFont) -> float:
+        """获取文本步进宽度，与 font.getlength(text) 结果一致
+
+        参数:
+            text: 文本
+            font: 字体
+
+        返回:
+            float: 步进宽度
+        """
+        if CJK_PATTERN.match(text):
+            glyphs = cls.glyphs(font)
+            return sum(cls._glyph(glyphs, ch, font)[0] for ch in text)
+        return font.getlength(text, mode="L")
+
+    @classmethod
+    def metrics(cls, text: str, font: FreeTypeFont) -> list[GlyphMetrics]:
+        """获取文本中每个字符的字形度量，相同字体的字符只测量一次
+
+        参数:
+            text: 文本
+            font: 字体
+
+        返回:
+            list[GlyphMetrics]: 每个字符的 (步进宽度, 边界框)
+        """
+        glyphs = cls.glyphs(font)
+        return [cls._glyph(glyphs, char, font) for char in text]
+
+    @classmethod
+    def glyphs(cls, font: FreeTypeFont) -> dict[str, GlyphMetrics]:
+        """获取字体的字形度量表
+
+        参数:
+            font: 字体
+
+        返回:
+            dict[str, GlyphMetrics]: 字形度量表
+        """
+        if (key := cls.font_key(font)) is None:
+            return {}
+        return cls._glyph_cache.get_or_create(key, dict)
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._bbox_cache.clear()
+        cls._glyph_cache.clear()
+        cls.glyph_hits = 0
+
+    @classmethod
+    def configure(cls, max_size: int | None = None, max_fonts: int | None = None):
+        """设置缓存上限
+
+        参数:
+            max_size: 最大缓存文本数量.
+            max_fonts: 最大缓存字形表的字体数量.
+        """
+        cls._bbox_cache.resize(max_size)
+        cls._glyph_cache.resize(max_fonts)
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 统计数据
+        """
+        return {
+            "bbox": cls._bbox_cache.stats(),
+            "glyph": cls._glyph_cache.stats(),
+            "glyph_hits": cls.glyph_hits,
+        }
+
+    @classmethod
+    def _glyph(
+        cls, glyphs: dict[str, GlyphMetrics], char: str, font: FreeTypeFont
+    ) -> GlyphMetrics:
+        """获取单个字形度量"""
+        if (metrics := glyphs.get(char)) is None:
+            metrics = glyphs[char] = (
+                font.getlength(char, mode="L"),
+                font.getbbox(char, mode="L"),  # type: ignore
+            )
+        return metrics
+
+    @classmethod
+    def _glyph_bbox(
+        cls, text: str, font: FreeTypeFont
+    ) -> tuple[int, int, int, int] | None:
+        """使用字形度量合成边界框，步进宽度非整数像素时无法精确合成，返回 None"""
+        glyphs = cls.glyphs(font)
+        pen = 0
+        left = top = 1 << 30
+        right = bottom = -(1 << 30)
+        for char in text:
+            advance, (x0, y0, x1, y1) = cls._glyph(glyphs, char, font)
+            if not advance.is_integer():
+                return None
+            left = min(left, pen + x0)
+            right = max(right, pen + x1)
+            top = min(top, y0)
+            bottom = max(bottom, y1)
+            pen += int(advance)
+        cls.glyph_hits += 1
+        return left, top, right, bottom
+
+
+class TextSprite:
+    """
+    文本贴图缓存
+
+    以 (字体, 文本) 为键缓存单行文本渲染后的 L 模式透明度蒙版，绘制时按颜色填充，
+    颜色与背景不影响蒙版，因此同一段文本在不同颜色与背景下共用一份缓存
+    """
+
+    _cache: LRUCache[tuple[Hashable, str], tuple[Image.Image, int, int]] = LRUCache(
+        max_size=0,
+        max_bytes=16 * 1024 * 1024,
+        sizeof=lambda sprite: sprite[0].width * sprite[0].height,
+    )
+    enable: bool = True
+    """是否启用缓存"""
+    modes: tuple[str, ...] = ("L", "RGB", "RGBA")
+    """支持的画布类型，与 ImageDraw 使用 L 模式字体蒙版的类型一致"""
+
+    @classmethod
+    def get(cls, text: str, font: FreeTypeFont) -> tuple[Image.Image, int, int]:
+        """获取文本蒙版，未命中时渲染
+
+        参数:
+            text: 单行文本
+            font: 字体
+
+        返回:
+            tuple[Image.Image, int, int]: 蒙版, 相对绘制坐标的 x 偏移, y 偏移
+        """
+
+        def factory() -> tuple[Image.Image, int, int]:
+            x0, y0, x1, y1 = font.getbbox(text, mode="L")
+            mask = Image.new("L", (max(x1 - x0, 0), max(y1 - y0, 0)), 0)
+            if mask.width and mask.height:
+                ImageDraw.Draw(mask).text((-x0, -y0), text, fill=255, font=font)
+            return mask, int(x0), int(y0)
+
+        if (key := TextMeasure.font_key(font)) is None:
+            return factory()
+        return cls._cache.get_or_create((key, text), factory)
+
+    @classmethod
+    def paste(
+        cls,
+        image: Image.Image,
+        pos: tuple[int, int],
+        text: str,
+        fill: str | tuple,
+        font: Any,
+    ) -> bool:
+        """使用缓存的蒙版绘制文本，结果与 ImageDraw.text 一致
+
+        参数:
+            image: 画布
+            pos: 坐标
+            text: 文本
+            fill: 文字颜色
+            font: 字体
+
+        返回:
+            bool: 是否支持绘制，不支持(多行文本，非整数坐标等)时需使用 ImageDraw.text
+        """
+        if (
+            not cls.enable
+            or image.mode not in cls.modes
+            or not isinstance(font, FreeTypeFont)
+            or fill is None
+            or "\n" in text
+            or type(pos[0]) is not int
+            or type(pos[1]) is not int
+        ):
+            return False
+        mask, x, y = cls.get(text, font)
+        if mask.width and mask.height:
+            x += pos[0]
+            y += pos[1]
+            image.paste(fill, (x, y, x + mask.width, y + mask.height), mask)
+        return True
+
+    @classmethod
+    def configure(cls, max_size: int | None = None, max_bytes: int | None = None):
+        """设置缓存上限
+
+        参数:
+            max_size: 最大文本数量，为 0 时不限制.
+            max_bytes: 最大占用字节数.
+        """
+        cls._cache.resize(max_size, max_bytes)
+
+    @classmethod
+    def clear(cls):
+        """清空缓存"""
+        cls._cache.clear()
+
+    @classmethod
+    def stats(cls) -> dict[str, Any]:
+        """缓存统计
+
+        返回:
+            dict[str, Any]: 统计数据
+        """
+        return cls._cache.stats()
@@ -1,17 +1,24 @@
-import os
-import random
-import re
 from collections.abc import Awaitable, Callable
-from io import BytesIO
 from pathlib import Path
 
 from nonebot.utils import is_coroutine_callable
 
+from ._background_pool import BackgroundPool
 from ._build_image import BuildImage, ColorAlias
 from ._build_mat import BuildMat, MatType  # noqa: F401
-from ._image_template import ImageTemplate, RowStyle  # noqa: F401
-
-# TODO: text2image 长度错误
+from ._image_cache import FontCache, ImageCache, MaskCache  # noqa: F401
+from ._image_encoder import EncodeFormat, ImageEncoder
+from ._image_pack import ImagePacker, PackLayout
+from ._image_template import ImageTemplate, RowStyle, TablePages  # noqa: F401
+from ._render_cache import RenderCache  # noqa: F401
+from ._render_executor import RenderExecutor, render_sync  # noqa: F401
+from ._render_pool import RenderPool  # noqa: F401
+from ._render_profile import RenderProfile  # noqa: F401
+from ._strip_render import StripRenderer
+from ._table_render import TableRenderer  # noqa: F401
+from ._text_layout import TextLayout
+from ._text_markup import TextMarkup, TextStyle
+from ._text_measure import TextMeasure, TextSprite  # noqa: F401
 
 
 async def text2image(
@@ -23,6 +30,7 @@ async def text2image(
     font_color: str | tuple[int, int, int] = (0, 0, 0),
     padding: int | tuple[int, int, int, int] = 0,
     _add_height: float = 0,
+    max_width: int | None = None,
 ) -> BuildImage:
     """解析文本并转为图片
         使用标签
@@ -31,6 +39,7 @@ async def text2image(
             font: str -> 特殊文本字体
             fs / font_size: int -> 特殊文本大小
             fc / font_color: Union[str, Tuple[int, int, int]] -> 特殊文本颜色
+            标签可以嵌套，内层未设置的配置项继承外层
         示例
             在不在，<f font=YSHaoShenTi-2.ttf font_size=30 font_color=red>HibiKi小姐</f>，
             你最近还好吗，<f font_size=15 font_color=black>我非常想你</f>，这段时间我非常不好过，
@@ -44,9 +53,14 @@ async def text2image(
          font_color: 普通字体颜色
          padding: 文本外边距，元组类型时为 （上，左，下，右）
          _add_height: 由于get_size无法返回正确的高度，采用手动方式额外添加高度
+         max_width: 最大文本宽度，设置后超出时自动换行，中日韩文本可在任意字符间换行
     """
     if not text:
         raise ValueError("文本转图片 text 不能为空...")
+    if max_width or (auto_parse and TextMarkup.has_markup(text)):
+        return await _draw_text_layout(
+            text, auto_parse, font_size, color, font, font_color, padding, max_width
+        )
     pw = ph = top_padding = left_padding = 0
     if padding:
         if isinstance(padding, int):
@@ -59,226 +73,91 @@ async def text2image(
             top_padding = padding[0]
             left_padding = padding[1]
     _font = BuildImage.load_font(font, font_size)
-    if auto_parse and re.search(r"<f(.*)>(.*)</f>", text):
-        _data = []
-        new_text = ""
-        placeholder_index = 0
-        for s in text.split("</f>"):
-            r = re.search(r"<f(.*)>(.*)", s)
-            if r:
-                start, end = r.span()
-                if start != 0 and (t := s[:start]):
-                    new_text += t
-                _data.append(
-                    [
-                        (start, end),
-                        f"[placeholder_{placeholder_index}]",
-                        r.group(1).strip(),
-                        r.group(2),
-                    ]
-                )
-                new_text += f"[placeholder_{placeholder_index}]"
-                placeholder_index += 1
-        new_text += text.split("</f>")[-1]
-        image_list = []
-        current_placeholder_index = 0
-        # 切分换行，每行为单张图片
-        for s in new_text.split("\n"):
-            _tmp_text = s
-            img_width = 0
-            img_height = BuildImage.get_text_size("正", _font)[1]
-            _tmp_index = current_placeholder_index
-            for _ in range(s.count("[placeholder_")):
-                placeholder = _data[_tmp_index]
-                if "font_size" in placeholder[2]:
-                    r = re.search(r"font_size=['\"]?(\d+)", placeholder[2])
-                    if r:
-                        w, h = BuildImage.get_text_size(
-                            placeholder[3], font, int(r.group(1))
-                        )
-                        img_height = img_height if img_height > h else h
-                        img_width += w
-                else:
-                    img_width += BuildImage.get_text_size(placeholder[3], _font)[0]
-                _tmp_text = _tmp_text.replace(f"[placeholder_{_tmp_index}]", "")
-                _tmp_index += 1
-            img_width += BuildImage.get_text_size(_tmp_text, _font)[0]
-            # 开始画图
-            A = BuildImage(
-                img_width, img_height, color=color, font=font, font_size=font_size
-            )
-            basic_font_h = A.getsize("正")[1]
-            current_width = 0
-            # 遍历占位符
-            for _ in range(s.count("[placeholder_")):
-                if not s.startswith(f"[placeholder_{current_placeholder_index}]"):
-                    slice_ = s.split(f"[placeholder_{current_placeholder_index}]")
-                    await A.text(
-                        (current_width, A.height - basic_font_h - 1),
-                        slice_[0],
-                        font_color,
-                    )
-                    current_width += A.getsize(slice_[0])[0]
-                placeholder = _data[current_placeholder_index]
-                # 解析配置
-                _font = font
-                _font_size = font_size
-                _font_color = font_color
-                for e in placeholder[2].split():
-                    if e.startswith("font="):
-                        _font = e.split("=")[-1]
-                    if e.startswith("font_size=") or e.startswith("fs="):
-                        _font_size = int(e.split("=")[-1])
-                        if _font_size > 1000:
-                            _font_size = 1000
-                        if _font_size < 1:
-                            _font_size = 1
-                    if e.startswith("font_color") or e.startswith("fc="):
-                        _font_color = e.split("=")[-1]
-                text_img = await BuildImage.build_text_image(
-                    placeholder[3], font=_font, size=_font_size, font_color=_font_color
-                )
-                _img_h = (
-                    int(A.height / 2 - text_img.height / 2)
-                    if new_text == "[placeholder_0]"
-                    else A.height - text_img.height
-                )
-                await A.paste(text_img, (current_width, _img_h - 1))
-                current_width += text_img.width
-                s = s[
-                    s.index(f"[placeholder_{current_placeholder_index}]")
-                    + len(f"[placeholder_{current_placeholder_index}]") :
-                ]
-                current_placeholder_index += 1
-            if s:
-                slice_ = s.split(f"[placeholder_{current_placeholder_index}]")
-                await A.text((current_width, A.height - basic_font_h), slice_[0])
-                current_width += A.getsize(slice_[0])[0]
-            await A.crop((0, 0, current_width, A.height))
-            # A.show()
-            image_list.append(A)
-        height = 0
-        width = 0
-        for img in image_list:
-            height += img.h
-            width = width if width > img.w else img.w
-        width += pw
-        height += ph
-        A = BuildImage(width + left_padding, height + top_padding, color=color)
-        current_height = top_padding
-        for img in image_list:
-            await A.paste(img, (left_padding, current_height))
-            current_height += img.h
-    else:
-        width = 0
-        height = 0
-        _, h = BuildImage.get_text_size("正", _font)
-        line_height = int(font_size / 3)
-        image_list = []
-        for s in text.split("\n"):
-            w, _ = BuildImage.get_text_size(s.strip() or "正", _font)
-            height += h + line_height
-            width = width if width > w else w
-            image_list.append(
-                await BuildImage.build_text_image(
-                    s.strip(), font, font_size, font_color
-                )
-            )
-        height = sum(img.height + 8 for img in image_list) + pw
-        width += pw
-        # height += ph
-        A = BuildImage(
-            width + left_padding,
-            height + top_padding + 2,
-            color=color,
+    width = 0
+    height = 0
+    _, h = BuildImage.get_text_size("正", _font)
+    line_height = int(font_size / 3)
+    image_list = []
+    for s in text.split("\n"):
+        w, _ = BuildImage.get_text_size(s.strip() or "正", _font)
+        height += h + line_height
+        width = width if width > w else w
+        image_list.append(
+            await BuildImage.build_text_image(s.strip(), font, font_size, font_color)
         )
-        cur_h = ph
-        for img in image_list:
-            await A.paste(img, (pw, cur_h))
-            cur_h += img.height + line_height
+    height = sum(img.height + 8 for img in image_list) + pw
+    width += pw
+    # height += ph
+    A = BuildImage(
+        width + left_padding,
+        height + top_padding + 2,
+        color=color,
+    )
+    cur_h = ph
+    for img in image_list:
+        await A.paste(img, (pw, cur_h))
+        cur_h += img.height + line_height
+    return A
+
+
+async def _draw_text_layout(
+    text: str,
+    auto_parse: bool,
+    font_size: int,
+    color: str | tuple[int, int, int],
+    font: str,
+    font_color: str | tuple[int, int, int],
+    padding: int | tuple[int, int, int, int],
+    max_width: int | None,
+) -> BuildImage:
+    """排版文本并直接绘制至同一张预先计算好尺寸的画布，参数同 text2image"""
+    lines = TextMarkup.parse(text) if auto_parse else TextMarkup.plain(text)
+
+    def resolve(style: TextStyle):
+        _font = BuildImage.load_font(style.font or font, style.font_size or font_size)
+        return _font, style.font_color or font_color
+
+    layout = TextLayout.layout(lines, resolve, max_width)
+    spacing = int(font_size / 3)
+    width, height = TextLayout.size(layout, spacing)
+    top, left, bottom, right = (padding,) * 4 if isinstance(padding, int) else padding
+    A = BuildImage(
+        max(width, 1) + left + right, max(height, 1) + top + bottom, color=color
+    )
+    async with A.record():
+        current_height = top
+        for line in layout:
+            for run in line.runs:
+                if run.text.isspace():
+                    # 空白只占位置，坐标已在排版时计算
+                    continue
+                await A.text(
+                    (left + run.x, current_height + run.y),
+                    run.text,
+                    run.fill,
+                    font=run.font,
+                )
+            current_height += line.height + spacing
     return A
 
 
 def group_image(image_list: list[BuildImage]) -> tuple[list[list[BuildImage]], int]:
     """
     说明:
-        根据图片大小进行分组
+        根据图片大小进行分组，通过 ImagePacker 排列为接近正方形的多列
     参数:
          image_list: 排序图片列表
+    返回:
+        tuple[list[list[BuildImage]], int]: 分组图片列表, max(宽，高)
     """
-    image_list.sort(key=lambda x: x.height, reverse=True)
-    max_image = max(image_list, key=lambda x: x.height)
-
-    image_list.remove(max_image)
-    max_h = max_image.height
-    total_w = 0
-
-    # 图片分组
-    image_group = [[max_image]]
-    is_use = []
-    surplus_list = image_list[:]
-
-    for image in image_list:
-        if image.uid not in is_use:
-            group = [image]
-            is_use.append(image.uid)
-            curr_h = image.height
-            while True:
-                surplus_list = [x for x in surplus_list if x.uid not in is_use]
-                for tmp in surplus_list:
-                    temp_h = curr_h + tmp.height + 10
-                    if temp_h < max_h or abs(max_h - temp_h) < 100:
-                        curr_h += tmp.height + 15
-                        is_use.append(tmp.uid)
-                        group.append(tmp)
-                        break
-                else:
-                    break
-            total_w += max([x.width for x in group]) + 15
-            image_group.append(group)
-    while surplus_list:
-        surplus_list = [x for x in surplus_list if x.uid not in is_use]
-        if not surplus_list:
-            break
-        surplus_list.sort(key=lambda x: x.height, reverse=True)
-        for img in surplus_list:
-            if img.uid not in is_use:
-                _w = 0
-                index = -1
-                for i, ig in enumerate(image_group):
-                    if s := sum([x.height for x in ig]) > _w:
-                        _w = s
-                        index = i
-                if index != -1:
-                    image_group[index].append(img)
-                    is_use.append(img.uid)
-
-    max_h = 0
-    max_w = 0
-    for ig in image_group:
-        if (_h := sum([x.height + 15 for x in ig])) > max_h:
-            max_h = _h
-        max_w += max([x.width for x in ig]) + 30
-    is_use.clear()
-    while abs(max_h - max_w) > 200 and len(image_group) - 1 >= len(image_group[-1]):
-        for img in image_group[-1]:
-            _min_h = 999999
-            _min_index = -1
-            for i, ig in enumerate(image_group):
-                # if i not in is_use and (_h := sum([x.h for x in ig]) + img.h) > _min_h:
-                if (_h := sum([x.height for x in ig]) + img.height) < _min_h:
-                    _min_h = _h
-                    _min_index = i
-            is_use.append(_min_index)
-            image_group[_min_index].append(img)
-        max_w -= max([x.width for x in image_group[-1]]) - 30
-        image_group.pop(-1)
-        max_h = max([sum([x.height + 15 for x in ig]) for ig in image_group])
-    return image_group, max(max_h + 250, max_w + 70)
+    columns = ImagePacker.pack(image_list).columns
+    max_h = max(sum(x.height + 15 for x in ig) for ig in columns)
+    max_w = sum(max(x.width for x in ig) + 30 for ig in columns)
+    return columns, max(max_h + 250, max_w + 70)
 
 
 async def build_sort_image(
-    image_group: list[list[BuildImage]],
+    image_group: list[list[BuildImage]] | PackLayout,
     h: int | None = None,
     padding_top: int = 200,
     color: ColorAlias = (
@@ -293,18 +172,85 @@ async def build_sort_image(
     说明:
         对group_image的图片进行组装
     参数:
-         image_group: 分组图片列表
+         image_group: 分组图片列表，或 ImagePacker.pack 的排列结果
          h: max(宽，高)，一般为group_image的返回值，有值时，图片必定为正方形
          padding_top: 图像列表与最顶层间距
          color: 背景颜色
          background_path: 背景图片文件夹路径（随机）
          background_handle: 背景图额外操作
     """
-    bk_file = None
-    if background_path:
-        random_bk = os.listdir(background_path)
-        if random_bk:
-            bk_file = random.choice(random_bk)
+    bk_file = BackgroundPool.choice(background_path) if background_path else None
+    (image_w, image_h), placements = sort_image_layout(image_group, h, padding_top)
+    if bk_file:
+        A = await BackgroundPool.canvas(
+            bk_file,
+            (image_w, image_h),
+            color=color,
+            font="CJGaoDeGuo.otf",
+            font_size=24,
+        )
+    else:
+        A = BuildImage(
+            image_w, image_h, font_size=24, font="CJGaoDeGuo.otf", color=color
+        )
+    if background_handle:
+        if is_coroutine_callable(background_handle):
+            await background_handle(A)
+        else:
+            background_handle(A)
+    async with A.record():
+        for img, pos in placements:
+            await A.paste(img, pos)
+    return A
+
+
+async def build_sort_strip(
+    image_group: list[list[BuildImage]] | PackLayout,
+    h: int | None = None,
+    padding_top: int = 200,
+    color: ColorAlias = (255, 255, 255),
+    background_path: Path | None = None,
+) -> StripRenderer:
+    """
+    说明:
+        build_sort_image 的分条渲染版本，适用于超长图片，可通过 paginate 分页
+    参数:
+         image_group: 分组图片列表，或 ImagePacker.pack 的排列结果
+         h: max(宽，高)，一般为group_image的返回值，有值时，图片必定为正方形
+         padding_top: 图像列表与最顶层间距
+         color: 背景颜色
+         background_path: 背景图片文件夹路径（随机）
+    """
+    bk_file = BackgroundPool.choice(background_path) if background_path else None
+    (image_w, image_h), placements = sort_image_layout(image_group, h, padding_top)
+    background = None
+    if bk_file:
+        background = await render_sync(BackgroundPool.variant)(
+            bk_file, (image_w, image_h)
+        )
+    renderer = StripRenderer(image_w, image_h, color, background=background)
+    for img, pos in placements:
+        renderer.paste(img, pos)
+    return renderer
+
+
+def sort_image_layout(
+    image_group: list[list[BuildImage]] | PackLayout,
+    h: int | None = None,
+    padding_top: int = 200,
+) -> tuple[tuple[int, int], list[tuple[BuildImage, tuple[int, int]]]]:
+    """
+    说明:
+        计算 group_image 分组图片的组装布局
+    参数:
+         image_group: 分组图片列表，或 ImagePacker.pack 的排列结果
+         h: max(宽，高)
+         padding_top: 图像列表与最顶层间距
+    返回:
+        tuple[tuple[int, int], list]: 图片尺寸, 每张图片与坐标
+    """
+    if isinstance(image_group, PackLayout):
+        return ((h, h) if h else image_group.size), image_group.placements
     image_w = 0
     image_h = 0
     if not h:
@@ -318,35 +264,32 @@ async def build_sort_image(
     else:
         image_w = h
         image_h = h
-    A = BuildImage(
-        image_w,
-        image_h,
-        font_size=24,
-        font="CJGaoDeGuo.otf",
-        color=color,
-        background=(background_path / bk_file) if background_path and bk_file else None,
-    )
-    if background_handle:
-        if is_coroutine_callable(background_handle):
-            await background_handle(A)
-        else:
-            background_handle(A)
+    placements = []
     curr_w = 50
     for ig in image_group:
         curr_h = padding_top - 20
         for img in ig:
-            await A.paste(img, (curr_w, curr_h))
+            placements.append((img, (curr_w, curr_h)))
             curr_h += img.height + 10
         curr_w += max([x.width for x in ig]) + 30
-    return A
+    return (image_w, image_h), placements
 
 
-def pic2bytes(image) -> bytes:
+def pic2bytes(
+    image,
+    format: EncodeFormat | None = None,
+    quality: int | None = None,
+    compress_level: int | None = None,
+) -> bytes:
     """获取bytes
 
+    参数:
+        image: 图片
+        format: 输出格式，默认为 ImageEncoder.default_format.
+        quality: JPEG/WEBP 质量.
+        compress_level: PNG 压缩等级.
+
     返回:
         bytes: bytes
     """
-    buf = BytesIO()
-    image.save(buf, format="PNG")
-    return buf.getvalue()
+    return ImageEncoder.encode(image, format, quality, compress_level)